@@ -0,0 +1,61 @@
+"""
+Benchmark of the vectorized wavefront against the deque breadth first search previously used by
+GridMap._update_distances and GridMap.distance_matrix.
+
+USAGE go into the commons folder and run:
+python -m benchmarks.distance_field_benchmark
+"""
+import random
+import timeit
+import numpy as np
+from collections import deque
+
+import global_variables
+from classes.mapping.distance_field import wavefront
+from classes.mapping.grid_path_planner import GridPathPlanner
+from mapGeneration import generateMap
+
+
+def deque_bfs(walkable, start_point):
+    """the breadth first search as it was implemented in GridMap.distance_matrix"""
+    dist_shape = walkable.shape
+    distances = np.full((dist_shape[0], dist_shape[1]), -1, dtype=int)
+    queue = deque([(start_point, 0)])
+    while len(queue) > 0:
+        pos, dist = queue.popleft()
+        if distances[pos[0], pos[1]] == -1:  # to avoid infinite loop
+            distances[pos[0], pos[1]] = dist
+            for direction in global_variables.MOVING_DIRECTIONS:
+                new_pos = direction + pos
+                if 0 <= new_pos[0] < dist_shape[0] and 0 <= new_pos[1] < dist_shape[1]:
+                    if distances[new_pos[0], new_pos[1]] == -1:
+                        if walkable[new_pos[0], new_pos[1]]:
+                            queue.append((new_pos, dist + 1))
+    return distances
+
+
+def benchmark(size, repetitions=10):
+    """time both implementations on a generated map of size x size, starting from a random walkable cell
+
+    Returns:
+        tuple: average time in seconds of the deque bfs and of the wavefront
+    """
+    walkable = GridPathPlanner.walkable_mask(generateMap(size, size, 0.2, 3, 6))
+    free_cells = np.argwhere(walkable)
+    start_point = free_cells[random.randrange(len(free_cells))]
+
+    assert np.array_equal(deque_bfs(walkable, start_point), wavefront(walkable, start_point))
+
+    deque_time = timeit.timeit(lambda: deque_bfs(walkable, start_point), number=repetitions) / repetitions
+    wavefront_time = timeit.timeit(lambda: wavefront(walkable, start_point), number=repetitions) / repetitions
+    return deque_time, wavefront_time
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    np.random.seed(0)
+    print('{:>10} {:>12} {:>12} {:>8}'.format('map', 'deque [ms]', 'numpy [ms]', 'speedup'))
+    for size in [20, 50, 100]:
+        deque_time, wavefront_time = benchmark(size)
+        print('{:>10} {:>12.3f} {:>12.3f} {:>8.1f}'.format('{}x{}'.format(size, size), deque_time * 1000,
+                                                         wavefront_time * 1000, deque_time / wavefront_time))
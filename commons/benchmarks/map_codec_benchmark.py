@@ -0,0 +1,69 @@
+"""
+Benchmark of the size and of the encoding / decoding time of the maps sent between the agents, with the raw int16
+bytes previously sent by MapCommunication.publish_map and with map_codec.
+
+The maps are the explored maps in tests/test_maps and generated maps explored by a random walk of an agent.
+
+USAGE go into the commons folder and run:
+python -m benchmarks.map_codec_benchmark
+"""
+import random
+import timeit
+import numpy as np
+
+import global_variables
+from classes.mapping import map_codec
+from classes.mapping.distance_field import wavefront
+from classes.mapping.grid_path_planner import GridPathPlanner
+from mapGeneration import generateMap
+
+
+def explored_map(size, steps, vision=5):
+    """generate a map of size x size and keep known only the cells seen by an agent during a random walk"""
+    world = generateMap(size, size, 0.2, 3, 6).astype(global_variables.CELL_DTYPE)
+    walkable = GridPathPlanner.walkable_mask(world)
+    position = np.argwhere(walkable)[0]
+    path = [position]
+    for _ in range(steps):
+        direction = global_variables.MOVING_DIRECTIONS[random.randrange(4)]
+        if walkable[position[0] + direction[0], position[1] + direction[1]]:
+            position = position + direction
+            path.append(position)
+    seen = wavefront(np.ones(world.shape, dtype=bool), np.array(path))
+    world[seen > vision] = global_variables.UNKNOWN_CELL
+    return world
+
+
+def benchmark(matrix, repetitions=20):
+    """encode and decode the matrix with the raw bytes and with map_codec
+
+    Returns:
+        tuple: (raw size in bytes, raw time in seconds, codec size in bytes, codec time in seconds)
+    """
+    raw_dtype = np.dtype('<i2')
+    raw = matrix.astype(raw_dtype).tobytes()
+    data = map_codec.encode(matrix)
+    assert np.array_equal(map_codec.decode(data)[0], matrix)
+
+    raw_time = timeit.timeit(lambda: np.frombuffer(matrix.astype(raw_dtype).tobytes(), dtype=raw_dtype)
+                             .reshape(matrix.shape), number=repetitions) / repetitions
+    codec_time = timeit.timeit(lambda: map_codec.decode(map_codec.encode(matrix)), number=repetitions) / repetitions
+    return len(raw), raw_time, len(data), codec_time
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    np.random.seed(0)
+    maps = []
+    for name in ['agentA1', 'agentA3', 'agentA3_5agents']:
+        maps.append((name, np.loadtxt(open('tests/test_maps/{}.txt'.format(name), 'rb'), delimiter=',').astype(int)))
+    for size, steps in [(50, 300), (100, 1000), (200, 4000)]:
+        maps.append(('{}x{} walk {}'.format(size, size, steps), explored_map(size, steps)))
+
+    print('{:>20} {:>10} {:>10} {:>10} {:>10} {:>8}'.format('map', 'raw [B]', 'codec [B]', 'raw [ms]', 'codec [ms]',
+                                                           'ratio'))
+    for name, matrix in maps:
+        raw_size, raw_time, codec_size, codec_time = benchmark(matrix)
+        print('{:>20} {:>10} {:>10} {:>10.3f} {:>10.3f} {:>8.1f}'.format(name, raw_size, codec_size, raw_time * 1000,
+                                                                        codec_time * 1000,
+                                                                        float(raw_size) / codec_size))
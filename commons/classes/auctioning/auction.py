@@ -38,6 +38,9 @@ class Auction:
         """
 
         count = 0
+        # bids of the subtasks already assigned to the agent, computed once per auction. They don't change during the
+        # auction because the map doesn't change
+        assigned_bids = {}
         for task_name, task_object in self.agent.tasks.iteritems():
             if len(task_object.sub_tasks) <= self.agent.number_of_agents and not task_object.auctioned:
                 rospy.logdebug(self.agent._agent_name + "| -- Analyizing: " + task_name)
@@ -50,15 +53,17 @@ class Auction:
                         # first calculate the already assigned sub tasks
                         bid_value = 0
                         for t in self.agent.assigned_subtasks:
-                            bid_value += self.calculate_subtask_bid(t)[0]
+                            if t.sub_task_name not in assigned_bids:
+                                assigned_bids[t.sub_task_name] = self.calculate_subtask_bid(t)[0]
+                            bid_value += assigned_bids[t.sub_task_name]
 
                         # add the current
                         current_bid, distance_to_dispenser, closest_dispenser_position = self.calculate_subtask_bid(sub)
                         bid_value += current_bid
 
-                        # transform the coordinates in relative to the top_left
-                        if closest_dispenser_position is not None:
-                            closest_dispenser_position = self.agent.local_map._from_matrix_to_relative(closest_dispenser_position, self.agent.local_map.goal_top_left)
+                        # transform the coordinates in the world frame (relative to the top_left)
+                        if closest_dispenser_position is not None and self.agent.local_map.world_frame_known:
+                            closest_dispenser_position = self.agent.local_map._from_relative_to_world(closest_dispenser_position)
                         else:
                             # invalid dispenser position
                             closest_dispenser_position = np.array([-1000000, -1000000])
@@ -163,13 +168,16 @@ class Auction:
             pos, min_dist = self.agent.local_map.get_closest_dispenser_position(required_type)
 
             if pos is not None:  # the distance to the closer dispenser has been calculated
-                # add the distance to the goal
-
-                meeting_point = self.agent.local_map.goal_top_left  # TODO change the meeting point with communication
-                end = np.array([meeting_point[0], meeting_point[1]], dtype=int)
-                distance, path = self.agent.local_map.get_distance_and_path(pos, end, return_path=True)
-
-                bid_value = distance + min_dist  # distance from agent to dispenser + dispenser to goal
+                # add the distance to the goal, read from the cached distance field of the goal area
+                # TODO change the meeting point with communication
+                distance = self.agent.local_map.get_distance_to_goal_area(pos)
+
+                if distance != -1:
+                    # distance from agent to dispenser + dispenser to goal (counted as the number of cells of the path,
+                    # dispenser included)
+                    bid_value = distance + 1 + min_dist
+                else:
+                    pos = None  # the goal area can't be reached from the dispenser
 
                 # TODO uncomment this line and pass the position in coordinates
                 #  relative to the top left of the goal area
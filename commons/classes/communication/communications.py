@@ -87,12 +87,15 @@ class Communication:
 
         return pub_agents
 
-    def send_map(self, publisher, map, lm_y, lm_x, rows, columns):
+    def send_map(self, publisher, map, lm_y, lm_x, rows, columns, seq=0, keyframe=True, request_keyframe_from=""):
         """
         Send the map through the map topic
         Args:
             publisher (publisher): publisher handle returned from the function start_map
-            map (string): string version of the map matrix
+            map (string): string version of the map matrix (keyframe) or of the changed cells (delta)
+            seq (int): sequence number of the map messages of the agent
+            keyframe (bool): True if map is the whole map, False if it contains only the changed cells
+            request_keyframe_from (string): id of the agent that is asked to send the whole map, empty if none
 
         Returns: void
         """
@@ -101,10 +104,13 @@ class Communication:
         msg.message_id = self.generateID()
         msg.agent_id = self._agent_name
         msg.map = map
-        msg.lm_x = lm_x
-        msg.lm_y = lm_y
-        msg.rows = rows
-        msg.columns = columns
+        msg.lm_x = int(lm_x)
+        msg.lm_y = int(lm_y)
+        msg.rows = int(rows)
+        msg.columns = int(columns)
+        msg.seq = int(seq)
+        msg.keyframe = keyframe
+        msg.request_keyframe_from = request_keyframe_from
         publisher.publish(msg)
 
     def send_message(self, publisher, id_to, message_type, params):
@@ -144,10 +150,10 @@ class Communication:
         msg.message_id = self.generateID()
         msg.agent_id = self._agent_name
         msg.task_id = task_id
-        msg.bid_value = bid_value
-        msg.distance_to_dispenser = distance_to_dispenser
-        msg.closest_dispenser_position_x = closest_dispenser_position_x
-        msg.closest_dispenser_position_y = closest_dispenser_position_y
+        msg.bid_value = int(bid_value)
+        msg.distance_to_dispenser = int(distance_to_dispenser)
+        msg.closest_dispenser_position_x = int(closest_dispenser_position_x)
+        msg.closest_dispenser_position_y = int(closest_dispenser_position_y)
         publisher.publish(msg)
 
     def send_subtask_update(self, publisher, command, task_id):
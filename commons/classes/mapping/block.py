@@ -1,4 +1,5 @@
 import numpy as np
+from block_shape import BlockShape
 
 
 class Block:
@@ -23,14 +24,7 @@ class Block:
             rotate_direction(str): cw or ccw
         """
 
-        switch_sign = False
-        if self._position[0] == 0:
-            if rotate_direction == 'ccw':
-                switch_sign = True
-        else:
-            if rotate_direction == 'cw':
-                switch_sign = True
-        self._position = Block.switch_coordinates(position=self._position, change_sign=switch_sign)
+        self._position = np.array(BlockShape.rotate_offset(self._position, rotate_direction))
 
     def assign_block(self, subtask_id):
         """assigns the attached block to a specific subtask
@@ -47,25 +41,3 @@ class Block:
             this is for example necessary if the task was completed by the enemy team
         """
         self._subtask_id = None
-
-    # static methods
-
-    @staticmethod
-    def switch_coordinates(position, change_sign=False):
-        """switches x and y coordinates of a 2d point ( in this case block position relative to agent )
-
-        Note:
-            This is necessary when updating the blocks position when the agent rotates
-
-        Args:
-            position (np.array): coordinates [y,x] relative to the agent position
-            change_sign (bool): if true the sign is also changed
-
-        Returns:
-            position (np.array): updated position
-
-        """
-        if change_sign:
-            return np.array([-position[1], -position[0]])
-        else:
-            return np.array([position[1], position[0]])
@@ -0,0 +1,138 @@
+import numpy as np
+
+
+class BlockShape(object):
+    """Shape of the blocks attached to an agent with its 4 rotations precomputed.
+
+    The positions of the blocks are (y, x) coordinates relative to the agent, in the same order as the attached blocks.
+    The rotation with index r is the shape rotated clockwise r times, so a 'cw' rotation moves from index r to r + 1
+    and a 'ccw' rotation from r to r - 1 (modulo 4).
+    Index 0 is the shape as it was given when the object was created.
+    """
+
+    def __init__(self, blocks):
+        """
+        Args:
+            blocks (np.array or list): positions [y, x] of the blocks relative to the agent
+        """
+        # rotations as tuples of (y, x) python integers, useful for hashing and for the path planner
+        self.rotations = [tuple((int(block[0]), int(block[1])) for block in blocks)]
+        for i in range(3):
+            self.rotations.append(tuple(BlockShape.rotate_offset(block, 'cw') for block in self.rotations[-1]))
+
+        # for symmetric shapes (e.g. no blocks attached) different indexes have the same block positions.
+        # canonical[r] is the first index with the same positions as r
+        self.canonical = [self.rotations.index(rotation) for rotation in self.rotations]
+
+        # rotations as np.array, useful to create configurations
+        self.arrays = [np.array(rotation, dtype=int).reshape(-1, 2) for rotation in self.rotations]
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        """create the shape of a configuration (agent + blocks attached, the agent is the first element)"""
+        configuration = np.asarray(configuration)
+        return cls(configuration[1:] - configuration[0])
+
+    def rotation_index(self, blocks):
+        """get the index of the rotation that has the given blocks positions
+
+        Args:
+            blocks (np.array or list): positions [y, x] of the blocks relative to the agent
+
+        Returns:
+            int: the rotation index, None if the blocks are not a rotation of this shape
+        """
+        blocks = tuple((int(block[0]), int(block[1])) for block in blocks)
+        if blocks in self.rotations:
+            return self.rotations.index(blocks)
+        return None
+
+    def configuration_index(self, configuration):
+        """get the rotation index of a configuration (agent + blocks attached), None if it is not a rotation of this
+        shape"""
+        configuration = np.asarray(configuration)
+        return self.rotation_index(configuration[1:] - configuration[0])
+
+    @staticmethod
+    def rotate_index(index, rotate_direction):
+        """get the rotation index obtained rotating the rotation index in the given direction
+
+        Args:
+            index (int): the current rotation index
+            rotate_direction (str): cw or ccw
+
+        Returns:
+            int: the new rotation index
+        """
+        if rotate_direction == 'cw':
+            return (index + 1) % 4
+        else:   # ccw
+            return (index + 3) % 4
+
+    def configuration(self, agent_position, index):
+        """get the configuration (agent + blocks attached) of the shape rotated by index with the agent in
+        agent_position
+
+        Args:
+            agent_position (np.array): position of the agent
+            index (int): rotation index
+
+        Returns:
+            np.array: the agent position followed by the blocks positions, in the same coordinates as agent_position
+        """
+        agent_position = np.asarray(agent_position)
+        return np.vstack((agent_position.reshape(1, 2), self.arrays[index] + agent_position))
+
+    def placement_masks(self, walkable):
+        """compute for each rotation where the agent can stand with all the blocks on walkable cells
+
+        Args:
+            walkable (np.array): boolean matrix, True for the walkable cells
+
+        Returns:
+            np.array: boolean array of shape (4, rows, columns). masks[r, y, x] is True if the agent in (y, x) and the
+                blocks in rotation r are all inside the map and on walkable cells
+        """
+        walkable = np.asarray(walkable, dtype=bool)
+        masks = np.empty((4,) + walkable.shape, dtype=bool)
+        for index in range(4):
+            if self.canonical[index] != index:  # same blocks positions of a previous rotation
+                masks[index] = masks[self.canonical[index]]
+                continue
+            masks[index] = walkable
+            for block_y, block_x in self.rotations[index]:
+                BlockShape._and_shifted(masks[index], walkable, block_y, block_x)
+        return masks
+
+    @staticmethod
+    def _and_shifted(mask, walkable, shift_y, shift_x):
+        """mask[y, x] &= walkable[y + shift_y, x + shift_x], cells shifted outside of the map count as not walkable"""
+        rows, columns = walkable.shape
+        dest_top = max(0, -shift_y)
+        dest_bottom = max(dest_top, rows - max(0, shift_y))
+        dest_left = max(0, -shift_x)
+        dest_right = max(dest_left, columns - max(0, shift_x))
+
+        mask[dest_top:dest_bottom, dest_left:dest_right] &= walkable[dest_top + shift_y:dest_bottom + shift_y,
+                                                                     dest_left + shift_x:dest_right + shift_x]
+        mask[:dest_top, :] = False
+        mask[dest_bottom:, :] = False
+        mask[:, :dest_left] = False
+        mask[:, dest_right:] = False
+
+    @staticmethod
+    def rotate_offset(offset, rotate_direction):
+        """rotate a position relative to the agent
+
+        Args:
+            offset (tuple): (y, x) relative to the agent
+            rotate_direction (str): cw or ccw
+
+        Returns:
+            tuple: the rotated (y, x) position
+        """
+        y, x = offset
+        if rotate_direction == 'cw':
+            return x, -y
+        else:   # ccw
+            return -x, y
@@ -0,0 +1,275 @@
+""" This module contains the vectorized breadth first search used to compute the distance fields of the map """
+
+import numpy as np
+
+import global_variables
+
+# n, s, e, w moves, in the same order of global_variables.MOVING_DIRECTIONS
+NEIGHBORS = ((-1, 0), (1, 0), (0, 1), (0, -1))
+
+
+def wavefront(walkable, sources):
+    """Computes the distance of every cell from the closest source moving n, s, e, w on walkable cells.
+
+    Instead of popping one cell at a time from a queue, the whole frontier of the search is expanded at once
+    by shifting a boolean matrix in the 4 directions and masking it with the walkable cells.
+
+    Args:
+        walkable (np.array): boolean matrix, True for the walkable cells
+        sources (np.array): matrix coordinates [y, x] of the source cells, shape (2,) or (N, 2).
+            The sources get distance 0 even if they are not walkable
+
+    Returns:
+        np.array: matrix of distances with the same shape of walkable, -1 for the cells that can't be reached
+    """
+    rows, columns = walkable.shape
+    distances = np.full((rows, columns), -1, dtype=global_variables.DISTANCE_DTYPE)
+    sources = np.asarray(sources, dtype=int).reshape(-1, 2)
+    if rows == 0 or columns == 0 or sources.shape[0] == 0:
+        return distances
+
+    # the matrices have a border of one cell that is never walkable, so shifting doesn't need any bounds check
+    unreached = np.zeros((rows + 2, columns + 2), dtype=bool)
+    unreached[1:-1, 1:-1] = walkable
+    frontier = np.zeros((rows + 2, columns + 2), dtype=bool)
+    frontier[sources[:, 0] + 1, sources[:, 1] + 1] = True
+    unreached &= ~frontier
+    distances[frontier[1:-1, 1:-1]] = 0
+
+    next_frontier = np.zeros_like(frontier)
+    inner = next_frontier[1:-1, 1:-1]
+    distance = 0
+    while True:
+        # cells adjacent to the frontier that are walkable and not reached yet
+        np.logical_or(frontier[:-2, 1:-1], frontier[2:, 1:-1], out=inner)
+        inner |= frontier[1:-1, :-2]
+        inner |= frontier[1:-1, 2:]
+        inner &= unreached[1:-1, 1:-1]
+        if not inner.any():
+            break
+        distance += 1
+        distances[inner] = distance
+        unreached[1:-1, 1:-1] &= ~inner
+
+        frontier, next_frontier = next_frontier, frontier
+        inner = next_frontier[1:-1, 1:-1]
+
+    return distances
+
+
+def shortest_path(distances, target):
+    """Rebuilds a shortest path from the source of a distance field to the target.
+
+    The predecessors of a cell are its neighbors one step closer to the source, so they can be read from the distance
+    field itself: the path is followed backwards from the target in O(path length), without any search.
+
+    Args:
+        distances (np.array): matrix of distances from the source, -1 for the cells that can't be reached
+        target (np.array): matrix coordinates [y, x] of the last cell of the path
+
+    Returns:
+        np.array: matrix coordinates of the cells of the path from the source to the target, shape (N, 2).
+            None if the target can't be reached
+    """
+    rows, columns = distances.shape
+    y, x = int(target[0]), int(target[1])
+    if not (0 <= y < rows and 0 <= x < columns) or distances[y, x] < 0:
+        return None
+
+    distance = int(distances[y, x])
+    path = np.empty((distance + 1, 2), dtype=int)
+    path[distance] = y, x
+    while distance > 0:
+        distance -= 1
+        for move_y, move_x in NEIGHBORS:
+            if 0 <= y + move_y < rows and 0 <= x + move_x < columns and distances[y + move_y, x + move_x] == distance:
+                y, x = y + move_y, x + move_x
+                break
+        path[distance] = y, x
+    return path
+
+
+class IncrementalDistanceField(object):
+    """Distance field of a moving source (the agent) that is repaired from the previous step instead of being
+    recomputed from scratch.
+
+    Between two steps the agent moves at most one cell and only the cells around it change, so:
+    - when the source moves to an adjacent cell, every distance changes by exactly one (the grid is bipartite):
+      it decreases for the cells whose shortest path passed through the new source and increases for the others
+    - the cells that became blocked invalidate only the cells whose shortest paths passed through them
+    - the cells that became walkable, together with the invalidated ones, are relaxed in increasing distance order
+
+    The distances are kept in a matrix with a border of one cell that is never walkable, so that the neighbors of a
+    cell can be found with flat indexes without bounds checks. In all the other cases (first update, jumps of the
+    source, map shrinking) the field is computed from scratch with wavefront.
+    """
+
+    # distance of the cells that can't be reached, large enough to never be a real distance
+    UNREACHABLE = np.iinfo(global_variables.DISTANCE_DTYPE).max // 2
+
+    def __init__(self, check=False):
+        """
+        Args:
+            check (bool): if True every update is compared with the full recompute (wavefront), useful for testing
+        """
+        self.check = check
+        self._distances = None  # padded matrix of distances
+        self._walkable = None  # padded walkable matrix of the last update, the source is always walkable
+        self._source = None  # padded position of the source
+        self._origin = None
+
+    def update(self, walkable, source, origin=(0, 0)):
+        """Computes the distance of every cell from the source, reusing the field of the previous update.
+
+        Args:
+            walkable (np.array): boolean matrix, True for the walkable cells
+            source (np.array): matrix coordinates [y, x] of the source. It gets distance 0 even if it is not walkable
+            origin (np.array): matrix coordinates of a fixed point of the map. It is used to align the previous field
+                when the map has been expanded
+
+        Returns:
+            np.array: matrix of distances with the same shape of walkable, -1 for the cells that can't be reached
+        """
+        rows, columns = walkable.shape
+        new_walkable = np.zeros((rows + 2, columns + 2), dtype=bool)
+        new_walkable[1:-1, 1:-1] = walkable
+        new_source = (int(source[0]) + 1, int(source[1]) + 1)
+        new_walkable[new_source] = True
+
+        if not self._embed(new_walkable.shape, origin) or not self._move_source(new_source):
+            self._recompute(new_walkable, new_source)
+        else:
+            self._repair(new_walkable)
+        self._walkable = new_walkable
+        self._source = new_source
+        self._origin = np.array(origin, dtype=int)
+
+        distances = self._distances[1:-1, 1:-1].copy()
+        distances[distances == IncrementalDistanceField.UNREACHABLE] = -1
+
+        if self.check:
+            expected = wavefront(walkable, source)
+            if not np.array_equal(distances, expected):
+                raise AssertionError('incremental distance field differs from the full recompute in {} cells'.format(
+                    np.count_nonzero(distances != expected)))
+        return distances
+
+    def _recompute(self, walkable, source):
+        """compute the padded field from scratch"""
+        distances = wavefront(walkable[1:-1, 1:-1], np.array(source) - 1)
+        distances[distances == -1] = IncrementalDistanceField.UNREACHABLE
+        self._distances = np.full(walkable.shape, IncrementalDistanceField.UNREACHABLE,
+                                  dtype=global_variables.DISTANCE_DTYPE)
+        self._distances[1:-1, 1:-1] = distances
+
+    def _embed(self, shape, origin):
+        """move the previous field into the matrix of the new map, the new cells are not walkable and not reachable
+
+        Returns:
+            bool: False if there is no previous field or the new map doesn't contain the previous one
+        """
+        if self._distances is None:
+            return False
+        shift_y, shift_x = np.array(origin, dtype=int) - self._origin
+        old_rows, old_columns = self._distances.shape
+        if shift_y < 0 or shift_x < 0 or shift_y + old_rows > shape[0] or shift_x + old_columns > shape[1]:
+            return False
+        if (shift_y, shift_x) == (0, 0) and (old_rows, old_columns) == shape:
+            return True
+
+        distances = np.full(shape, IncrementalDistanceField.UNREACHABLE, dtype=global_variables.DISTANCE_DTYPE)
+        distances[shift_y + 1:shift_y + old_rows - 1, shift_x + 1:shift_x + old_columns - 1] = \
+            self._distances[1:-1, 1:-1]
+        walkable = np.zeros(shape, dtype=bool)
+        walkable[shift_y + 1:shift_y + old_rows - 1, shift_x + 1:shift_x + old_columns - 1] = \
+            self._walkable[1:-1, 1:-1]
+        self._distances = distances
+        self._walkable = walkable
+        self._source = (self._source[0] + shift_y, self._source[1] + shift_x)
+        return True
+
+    def _steps(self):
+        """offsets of the flat indexes of the n, s, e, w neighbors"""
+        columns = self._distances.shape[1]
+        return np.array([-columns, columns, 1, -1])
+
+    def _move_source(self, new_source):
+        """re-root the field of the previous walkable matrix in the new source
+
+        Returns:
+            bool: False if the new source is not adjacent to the old one (or not reachable from it)
+        """
+        if new_source == self._source:
+            return True
+        if abs(new_source[0] - self._source[0]) + abs(new_source[1] - self._source[1]) != 1 \
+                or self._distances[new_source] != 1:
+            return False
+
+        # the cells whose shortest path passes through the new source, found following the increasing distances
+        flat = self._distances.reshape(-1)
+        steps = self._steps()
+        layer = np.array([np.ravel_multi_index(new_source, self._distances.shape)])
+        layers = [layer]
+        distance = 1
+        while layer.size > 0:
+            neighbors = (layer[:, np.newaxis] + steps).reshape(-1)
+            layer = np.unique(neighbors[flat[neighbors] == distance + 1])
+            layers.append(layer)
+            distance += 1
+
+        flat[flat != IncrementalDistanceField.UNREACHABLE] += 1
+        flat[np.concatenate(layers)] -= 2
+        return True
+
+    def _repair(self, walkable):
+        """update the field after the walkable cells changed, the field must be rooted in the new source"""
+        flat = self._distances.reshape(-1)
+        walkable_flat = walkable.reshape(-1)
+        steps = self._steps()
+        changed = self._walkable != walkable
+        blocked = np.flatnonzero(changed & self._walkable)
+        opened = np.flatnonzero(changed & walkable)
+
+        # blocked cells are not reachable anymore, their successors are checked in increasing distance order
+        candidates = self._successors(blocked, flat[blocked], steps)
+        flat[blocked] = IncrementalDistanceField.UNREACHABLE
+        invalidated = []
+        while candidates.size > 0:
+            candidates_distances = flat[candidates]
+            distance = candidates_distances.min()
+            if distance == IncrementalDistanceField.UNREACHABLE:
+                break
+            current = np.unique(candidates[candidates_distances == distance])
+            candidates = candidates[candidates_distances != distance]
+            supported = (flat[current[:, np.newaxis] + steps] == distance - 1).any(axis=1)
+            lost = current[~supported]
+            if lost.size > 0:
+                invalidated.append(lost)
+                flat[lost] = IncrementalDistanceField.UNREACHABLE
+                candidates = np.concatenate((candidates, self._successors(lost, distance, steps)))
+
+        # invalidated and opened cells take the distance from their neighbors, then the decreases are propagated
+        seeds = np.unique(np.concatenate(invalidated + [opened]))
+        if seeds.size == 0:
+            return
+        tentative = flat[seeds[:, np.newaxis] + steps].min(axis=1) + 1
+        improved = tentative < flat[seeds]
+        frontier = seeds[improved]
+        flat[frontier] = tentative[improved]
+        while frontier.size > 0:
+            frontier_distances = flat[frontier]
+            distance = frontier_distances.min()
+            current = frontier[frontier_distances == distance]
+            frontier = frontier[frontier_distances != distance]
+            neighbors = (current[:, np.newaxis] + steps).reshape(-1)
+            neighbors = np.unique(neighbors[walkable_flat[neighbors] & (flat[neighbors] > distance + 1)])
+            flat[neighbors] = distance + 1
+            frontier = np.concatenate((frontier, neighbors))
+
+    def _successors(self, cells, distances, steps):
+        """neighbors of the cells that are one step further from the source"""
+        distances = np.broadcast_to(distances, cells.shape)
+        reachable = distances != IncrementalDistanceField.UNREACHABLE
+        neighbors = cells[reachable, np.newaxis] + steps
+        successors = self._distances.reshape(-1)[neighbors] == (distances[reachable, np.newaxis] + 1)
+        return neighbors[successors]
@@ -1,7 +1,5 @@
 import numpy as np
-from collections import deque
 import random
-import copy
 
 
 import os
@@ -10,6 +8,11 @@ from helpers import get_data_location
 from map_live_plotting import cleanup
 from grid_path_planner import GridPathPlanner
 from block import Block
+from block_shape import BlockShape
+from distance_field import wavefront, shortest_path, IncrementalDistanceField
+from grid_storage import GrowableGrid
+from information_gain import diamond_count
+from map_merge import mergePadding, fillUnknown
 
 import global_variables
 import rospy  # for debug logs
@@ -22,17 +25,34 @@ import itertools
 # ToDo: Identify if other entity is enemy or ally
 
 
-class GridMap():
+class GridMap(object):
     """
     Class that represent the local map of an agent like in the scenario.
 
     The map is a two dimensional np.array, initialized with size (11,11), that is the vision of the agent.
     If the agent moves in a direction, where is vision exceeds the border of the map, a new row / column is added to the np.array
+    (the map is a view of a bigger GrowableGrid, so most of the times the map is not copied)
     Note, that the first index of the np.array is for the y value and second is for the x value
 
     MAP SPECIFICATION
     Matrix of integers. Each value has the following meaning:
 
+    Both _representation and _path_planner_representation have a boolean walkable layer (_walkable and
+    _path_planner_walkable) that is kept in sync: assigning a whole matrix recomputes it, and single cells have to be
+    written with _write_representation and _write_path_planner_representation.
+    _path_planner_representation is _representation with an overlay of temporary stuffs (the agent, entities and
+    blocks that are not attached). The cells written with _write_representation are written in both, and the overlay
+    of every step only replaces the one of the previous step (see _update_path_planner_representation)
+
+    COORDINATE FRAMES
+    - matrix: indexes of _representation, they change every time the map grows
+    - relative: with respect to the starting position of the agent (origin is its position in the matrix). The
+      registries (dispensers, goal area, frontier) are kept in this frame, so they don't change when the map grows or
+      is merged
+    - world: with respect to the top left of the goal area, the same for all the agents. It is known once
+      goal_top_left is set (see world_frame_known), and it is used for everything that is sent to the other agents
+      (maps, bids and the dispensers of the subtasks)
+
     author: Alessandro
     """
     # counter variable
@@ -47,9 +67,13 @@ class GridMap():
         self.agent_vision = agent_vision
 
         # map
-        self._representation = np.full((11, 11), -1)  # init the map with unknown cells
+        self.map_version = 0  # incremented when the content or the extent of the map change, see get_map_snapshot
+        self._walkable_version = 0  # incremented when the walkable cells or the extent of the map change
+        self._path_planner_walkable_version = 0  # the same for the walkable cells of the path planner map
+        self._dumped_map_version = None  # version of the map last written to file, see _write_data_to_file
+        self._vision_mask = None  # cells in vision range of the agent, see _vision_area_mask
         self.origin = (self.agent_vision, self.agent_vision)  # the origin of the agent is at the center of the map
-        self._path_planner_representation = np.copy(self._representation)  # map with fixed and temporary stuffs
+        self._representation = np.full((11, 11), -1, dtype=global_variables.CELL_DTYPE)  # init the map with unknown cells
 
         # info about agent in map
         self._agent_position = np.array([0, 0])
@@ -58,18 +82,27 @@ class GridMap():
         # agent_in_matrix = self._from_relative_to_matrix(self._agent_position)
         # self._representation[agent_in_matrix[1]][agent_in_matrix[0]] = -4
         self._distances = np.array([])  # the matrix of all the distances from the agent
-        self.is_at_goal_area = False
+        self._distances_key = None  # path planner map version and agent position of the distances
+        self._distance_field = IncrementalDistanceField(check=global_variables.CHECK_INCREMENTAL_DISTANCES)
+        # distance fields on the fixed map (from the goal area, the dispensers, ...), see _get_static_distance_field
+        self._static_fields = {}
+        self._static_fields_version = self._walkable_version
         self.failed_last_move = False
 
         # objects in map
-        self._dispensers = []
-        self._goal_areas = []
+        # self._dispensers (dispenser type -> relative positions) is built with the map, see _rebuild_dispensers
+        # self._goal_cells (relative positions of the goal area cells) is built with the map, see _rebuild_goal_area
         self._agents = []
         self._temporary_obstacles = []
 
         # the list of attached blocks
         # attached blocks are objects of class Block
         self._attached_blocks = []
+        # shape of the attached blocks with all the rotations, see _get_attached_shape
+        self._attached_shape = BlockShape([])
+        # cache of the placement masks of the attached shape, see _get_placement_masks
+        self._placement_masks = None
+        self._placement_masks_shape = None
 
         # goal area discovery
         self.goal_area_fully_discovered = False
@@ -96,6 +129,127 @@ class GridMap():
         self.PLOT_FREQUENCY = 1
         self.live_plotting = global_variables.LIVE_PLOTTING
 
+    @property
+    def _representation(self):
+        """map with the fixed stuffs (walls, goal area, dispensers, ...)"""
+        return self._representation_matrix
+
+    @_representation.setter
+    def _representation(self, matrix):
+        matrix = np.asarray(matrix, dtype=global_variables.CELL_DTYPE)
+        self._representation_storage = GrowableGrid(matrix, global_variables.UNKNOWN_CELL)
+        self._walkable_storage = GrowableGrid(GridPathPlanner.walkable_mask(matrix), False)
+        self._representation_matrix = self._representation_storage.matrix
+        self._walkable = self._walkable_storage.matrix
+        self.map_version += 1
+        self._walkable_changed()
+        self._rebuild_dispensers()
+        self._rebuild_goal_area()
+        self._rebuild_information_gain()
+        self._changed_cells = set()  # relative positions of the cells changed since pop_changed_cells
+        self._path_planner_representation = matrix  # map with fixed and temporary stuffs
+
+    @property
+    def _path_planner_representation(self):
+        """map with fixed and temporary stuffs (entities, blocks) used by the path planner"""
+        return self._path_planner_matrix
+
+    @_path_planner_representation.setter
+    def _path_planner_representation(self, matrix):
+        matrix = np.asarray(matrix, dtype=global_variables.CELL_DTYPE)
+        self._path_planner_storage = GrowableGrid(matrix, global_variables.UNKNOWN_CELL)
+        self._path_planner_walkable_storage = GrowableGrid(GridPathPlanner.walkable_mask(matrix), False)
+        self._path_planner_matrix = self._path_planner_storage.matrix
+        self._path_planner_walkable = self._path_planner_walkable_storage.matrix
+        self._path_planner_walkable_version += 1
+        self._placement_masks = None
+        # overlay of temporary stuffs written in the path planner map: relative positions and values of the cells
+        self._overlay_positions = np.zeros((0, 2), dtype=int)
+        self._overlay_values = np.zeros(0, dtype=global_variables.CELL_DTYPE)
+
+    def _write_representation(self, rows, columns, values, track_changes=True):
+        """write cells of the representation and of its walkable layer
+
+        Args:
+            rows (int or np.array): matrix rows of the cells
+            columns (int or np.array): matrix columns of the cells
+            values (int or np.array): new values of the cells
+            track_changes (bool): add the cells that changed to the changed cells (see pop_changed_cells). False for
+                the cells received from the other agents, that they already sent
+        """
+        old_values = np.copy(self._representation_matrix[rows, columns])  # slices would give a view
+        if np.all(old_values == values):
+            return
+        self.map_version += 1
+        self._representation_matrix[rows, columns] = values
+        walkable = GridPathPlanner.walkable_mask(values)
+        if np.any(self._walkable[rows, columns] != walkable):
+            self._walkable[rows, columns] = walkable
+            self._walkable_changed()
+        self._write_path_planner_representation(rows, columns, values)
+        self._update_dispensers(rows, columns, old_values)
+        self._update_goal_area(rows, columns, old_values)
+        self._update_information_gain(rows, columns, old_values)
+        if track_changes:
+            self._update_changed_cells(rows, columns, old_values)
+
+    def _update_changed_cells(self, rows, columns, old_values):
+        """add the written cells whose value changed to the changed cells (see pop_changed_cells)
+
+        Args:
+            rows (int, np.array or slice): matrix rows of the written cells
+            columns (int, np.array or slice): matrix columns of the written cells
+            old_values (int or np.array): values of the cells before they were written
+        """
+        changed = old_values != self._representation_matrix[rows, columns]
+        rows, columns = GridMap._select_written_cells(rows, columns, changed)
+        self._changed_cells.update(zip((rows - self.origin[0]).tolist(), (columns - self.origin[1]).tolist()))
+
+    def pop_changed_cells(self):
+        """get the cells of the map that changed since the last call (or since the map was assigned) and forget them.
+        Only the changes written by this agent are kept, not the cells merged from the other agents
+
+        Returns:
+            tuple: (relative positions [y, x] of the cells sorted by y and then x (np.array of shape (N, 2)),
+                current values of the cells (np.array))
+        """
+        positions = np.array(sorted(self._changed_cells), dtype=int).reshape(-1, 2)
+        self._changed_cells = set()
+        cells = positions + self.origin
+        return positions, self._representation_matrix[cells[:, 0], cells[:, 1]]
+
+    def _walkable_changed(self):
+        """to be called when the walkable cells or the extent of the representation change. It invalidates the
+        distance fields on the fixed map"""
+        self._walkable_version += 1
+
+    def _write_path_planner_representation(self, rows, columns, values):
+        """write cells of the path planner representation and of its walkable layer
+
+        Args:
+            rows (int or np.array): matrix rows of the cells
+            columns (int or np.array): matrix columns of the cells
+            values (int or np.array): new values of the cells
+        """
+        self._path_planner_matrix[rows, columns] = values
+        walkable = GridPathPlanner.walkable_mask(values)
+        if np.any(self._path_planner_walkable[rows, columns] != walkable):
+            self._path_planner_walkable[rows, columns] = walkable
+            self._path_planner_walkable_version += 1
+            self._placement_masks = None
+
+    def get_map_snapshot(self):
+        """get the map without copying it, with its version. The version changes every time the map changes, so it
+        can be used to skip the work done on a map that didn't change (publishing it, writing it to file, ...)
+
+        Returns:
+            tuple: (map version (int), read-only view of the map (np.array), origin (np.array)).
+                The view shows the map of that version only until the map version changes: copy it to keep it
+        """
+        snapshot = self._representation_matrix.view()
+        snapshot.flags.writeable = False
+        return self.map_version, snapshot, np.array(self.origin)
+
     ### PUBLIC METHODS ###
     def update_map(self, perception):
         """Update the map according to the movement of the agent and the new perception.
@@ -104,8 +258,10 @@ class GridMap():
         """
         # if last action was `rotate` update blocks position
         if perception.agent.last_action == "rotate" and perception.agent.last_action_result == "success":
-            for block in self._attached_blocks:
-                block.rotate(rotate_direction=perception.agent.last_action_params[0])
+            shape, rotation_index = self._get_attached_shape()
+            rotation_index = shape.rotate_index(rotation_index, perception.agent.last_action_params[0])
+            for block, position in zip(self._attached_blocks, shape.arrays[rotation_index]):
+                block._position = np.copy(position)
 
         # if last action was `move` update agent position and expand map size if sight is out of bounds
         if perception.agent.last_action == "move" and perception.agent.last_action_result == "success":
@@ -131,53 +287,32 @@ class GridMap():
             rospy.loginfo('{} attached to block of type {} in direction {}'.format(self.agent_name, block_type, attach_direction))
 
         agent_in_matrix = self._from_relative_to_matrix(self._agent_position)
-        self._representation[agent_in_matrix[0], agent_in_matrix[1]] = global_variables.AGENT_CELL
-        # update empty cells (all cells that are in vision range, get overwritten below if they are occupied)
-        for j in range(-self.agent_vision, self.agent_vision + 1):
-            for i in range(-self.agent_vision, self.agent_vision + 1):
-                cell = agent_in_matrix + np.array([j, i])
-                if 0 < GridMap.manhattan_distance(agent_in_matrix, cell) <= self.agent_vision:
-                    self._representation[cell[0]][cell[1]] = 0
+        # the new vision area is built in a window of the map and written at once, so the cells that didn't change
+        # are not written and the map version changes only if something new has been perceived
+        top, left, window = self._vision_window(agent_in_matrix)
+        window[agent_in_matrix[0] - top, agent_in_matrix[1] - left] = global_variables.AGENT_CELL
 
         # update obstacles
-        for obs in perception.obstacles:
-            pos = np.array([obs.pos.y, obs.pos.x]) + self._agent_position
-            matrix_pos = self._from_relative_to_matrix(pos)
-            # first index --> y value, second  --> x value
-
-            self._representation[matrix_pos[0]][matrix_pos[1]] = global_variables.WALL_CELL
+        obstacles = self._perceived_cells(perception.obstacles, agent_in_matrix)
+        # first column --> y value, second  --> x value
+        window[obstacles[:, 0] - top, obstacles[:, 1] - left] = global_variables.WALL_CELL
 
         # update goal cells
-        self.is_at_goal_area = False
-        for goal in perception.goals:
-            # save if the agent is in the goal area
-            if goal.pos.x == 0 and goal.pos.y == 0:
-                self.is_at_goal_area = True
-            # to activate the goal area discovering if the agent spawn in the middle of it
-            if self.STEP == 0:
-                self._start_discovering_goal_area = True
-            # add to local map
-            pos = np.array([goal.pos.y, goal.pos.x]) + self._agent_position
-            matrix_pos = self._from_relative_to_matrix(pos)
-            # first index --> y value, second  --> x value
-            self._representation[matrix_pos[0]][matrix_pos[1]] = global_variables.GOAL_CELL
-
-            # add to goals variable
-            # if not self._goal_areas.__contains__(pos):
-            # self._goal_areas.append(pos)
+        goals = self._perceived_cells(perception.goals, agent_in_matrix)
+        # to activate the goal area discovering if the agent spawn in the middle of it
+        if len(goals) > 0 and self.STEP == 0:
+            self._start_discovering_goal_area = True
+        # add to local map
+        window[goals[:, 0] - top, goals[:, 1] - left] = global_variables.GOAL_CELL
 
         # update dispensers
-        for dispenser in perception.dispensers:
-            pos = np.array([dispenser.pos.y, dispenser.pos.x]) + self._agent_position
-            matrix_pos = self._from_relative_to_matrix(pos)
-            # get dispenser type
-            for i in range(9):
-                if str(i) in dispenser.type:
-                    self._representation[matrix_pos[0]][matrix_pos[1]] = global_variables.DISPENSER_STARTING_NUMBER + i
-        self.update_dispsenser_list()
-
-
+        dispensers = self._perceived_cells(perception.dispensers, agent_in_matrix)
+        dispenser_values = np.array([GridMap._dispenser_cell_value(dispenser.type)
+                                     for dispenser in perception.dispensers], dtype=int)
+        typed = dispenser_values != global_variables.UNKNOWN_CELL
+        window[dispensers[typed, 0] - top, dispensers[typed, 1] - left] = dispenser_values[typed]
 
+        self._write_representation(slice(top, top + window.shape[0]), slice(left, left + window.shape[1]), window)
 
         # write data to file, used for live plotting plotting
         if self.live_plotting and self.STEP % self.PLOT_FREQUENCY == 0:
@@ -185,86 +320,375 @@ class GridMap():
 
         self.STEP += 1
 
-    def update_dispsenser_list(self):
-        """update the dispensers in the dispenser_list"""
-        new_list = []
-        for y in range(self._representation.shape[0]):
-            for x in range(self._representation.shape[1]):
-                pos_matrix = np.array([y,x])
-                cell_value = self._get_value_of_cell(pos_matrix)
-                dispenser_type = self.get_dispenser_type(cell_value=cell_value)
-                if dispenser_type:
-                    pos_relative = self._from_matrix_to_relative(pos_matrix)
-                    new_list.append({'pos': pos_relative, 'type': dispenser_type})
-        self._dispensers = new_list
+    def _vision_area_mask(self):
+        """get the cells in vision range of the agent (manhattan distance between 1 and agent_vision), as a boolean
+        matrix of shape (2 * agent_vision + 1, 2 * agent_vision + 1) centered in the agent. It is computed only once"""
+        vision = self.agent_vision
+        if self._vision_mask is None or self._vision_mask.shape[0] != 2 * vision + 1:
+            offsets = np.abs(np.arange(-vision, vision + 1))
+            distances = offsets[:, np.newaxis] + offsets[np.newaxis, :]
+            self._vision_mask = (distances > 0) & (distances <= vision)
+        return self._vision_mask
+
+    def _vision_area_offsets(self):
+        """get the positions [y, x] relative to the agent of the cells in vision range, shape (N, 2)"""
+        return np.argwhere(self._vision_area_mask()) - self.agent_vision
+
+    def _vision_window(self, agent_in_matrix):
+        """get a copy of the window of the map around the agent with all the cells in vision range set to empty (all
+        cells that are in vision range are empty, unless something is perceived in them)
+
+        Args:
+            agent_in_matrix (np.array): agent position in matrix coordinates
+
+        Returns:
+            tuple: (top row (int), left column (int), window (np.array))
+        """
+        mask = self._vision_area_mask()
+        vision = self.agent_vision
+        rows, columns = self._representation.shape
+        # window of the vision area inside the map
+        top, left = max(agent_in_matrix[0] - vision, 0), max(agent_in_matrix[1] - vision, 0)
+        bottom = min(agent_in_matrix[0] + vision + 1, rows)
+        right = min(agent_in_matrix[1] + vision + 1, columns)
+        mask = mask[top - agent_in_matrix[0] + vision:bottom - agent_in_matrix[0] + vision,
+                    left - agent_in_matrix[1] + vision:right - agent_in_matrix[1] + vision]
+        window = self._representation_matrix[top:bottom, left:right]
+        return top, left, np.where(mask, global_variables.EMPTY_CELL, window).astype(global_variables.CELL_DTYPE)
+
+    @staticmethod
+    def _perceived_cells(things, agent_in_matrix):
+        """get the matrix coordinates of the perceived things (obstacles, goals, dispensers, ...)
+
+        Args:
+            things (list): perceived things with a position relative to the agent (pos.x, pos.y)
+            agent_in_matrix (np.array): agent position in matrix coordinates
+
+        Returns:
+            np.array: matrix coordinates [y, x] of the things, shape (N, 2)
+        """
+        cells = np.array([[thing.pos.y, thing.pos.x] for thing in things], dtype=int).reshape(-1, 2)
+        return cells + agent_in_matrix
+
+    @staticmethod
+    def _dispenser_cell_value(dispenser_type):
+        """get the cell value of a dispenser of the given type (e.g. b1), UNKNOWN_CELL if the type is not valid"""
+        value = global_variables.UNKNOWN_CELL
+        for i in range(9):
+            if str(i) in dispenser_type:
+                value = global_variables.DISPENSER_STARTING_NUMBER + i
+        return value
+
+    def _rebuild_dispensers(self):
+        """build the dispenser registry (dispenser type -> set of relative positions) from the whole map"""
+        self._dispensers = {}
+        self._dispenser_arrays = {}
+        for y, x in np.argwhere(GridMap._is_dispenser(self._representation_matrix)):
+            self._add_dispenser(self._representation_matrix[y, x], (y, x))
+
+    def _rebuild_information_gain(self):
+        """compute the information gain (see _count_unknown_in_vision) of the whole map and the frontier: the known
+        cells with information gain, as a set of relative positions"""
+        rows, columns = self._representation.shape
+        gain = self._count_unknown_in_vision(0, rows, 0, columns)
+        self._gain_storage = GrowableGrid(gain, 0)
+        self._information_gain = self._gain_storage.matrix
+
+        frontier = np.argwhere((self._representation_matrix != global_variables.UNKNOWN_CELL) & (gain > 0))
+        self._frontier = set(map(tuple, self._from_matrix_to_relative(frontier).tolist()))
+
+    def _count_unknown_in_vision(self, top, bottom, left, right):
+        """count for each cell of a window of the map the unknown cells the agent would see from it: the cells in vision
+        range (see _vision_area_mask) that are unknown or outside of the map
+
+        Args:
+            top, bottom, left, right (int): bounds of the window in matrix coordinates (bottom and right excluded)
+
+        Returns:
+            np.array: matrix with the counts, with the shape of the window
+        """
+        vision = self.agent_vision
+        unknown = self._unknown_window(top - vision, bottom + vision, left - vision, right + vision)
+        return diamond_count(unknown, vision)
+
+    def _unknown_window(self, top, bottom, left, right):
+        """get a boolean matrix of a window of the map, True for the unknown cells and the cells outside of the map"""
+        rows, columns = self._representation.shape
+        window = np.ones((bottom - top, right - left), dtype=bool)
+        inside_top, inside_bottom = max(top, 0), min(bottom, rows)
+        inside_left, inside_right = max(left, 0), min(right, columns)
+        if inside_top < inside_bottom and inside_left < inside_right:
+            window[inside_top - top:inside_bottom - top, inside_left - left:inside_right - left] = \
+                self._representation_matrix[inside_top:inside_bottom, inside_left:inside_right] \
+                == global_variables.UNKNOWN_CELL
+        return window
+
+    def _update_information_gain(self, rows, columns, old_values):
+        """update the information gain and the frontier around the written cells that were discovered (or became
+        unknown again)
+
+        Args:
+            rows (int, np.array or slice): matrix rows of the written cells
+            columns (int, np.array or slice): matrix columns of the written cells
+            old_values (int or np.array): values of the cells before they were written
+        """
+        old_unknown = old_values == global_variables.UNKNOWN_CELL
+        new_unknown = self._representation_matrix[rows, columns] == global_variables.UNKNOWN_CELL
+        changed = old_unknown != new_unknown
+        if not np.any(changed):
+            return
+        rows, columns, new_unknown = GridMap._select_written_cells(rows, columns, changed, new_unknown)
+
+        # the cells that see the changed cells: their information gain goes down by one for every discovered cell
+        offsets = self._vision_area_offsets()
+        seeing_rows = (rows[:, np.newaxis] - offsets[:, 0]).reshape(-1)
+        seeing_columns = (columns[:, np.newaxis] - offsets[:, 1]).reshape(-1)
+        delta = np.repeat(np.where(new_unknown, 1, -1), len(offsets))
+        inside = (seeing_rows >= 0) & (seeing_rows < self._representation.shape[0]) \
+            & (seeing_columns >= 0) & (seeing_columns < self._representation.shape[1])
+        np.add.at(self._information_gain, (seeing_rows[inside], seeing_columns[inside]), delta[inside])
+
+        self._update_frontier(np.concatenate((rows, seeing_rows[inside])),
+                              np.concatenate((columns, seeing_columns[inside])))
+
+    def _update_frontier(self, rows, columns):
+        """add to the frontier or remove from it the given cells (matrix coordinates) according to their information
+        gain"""
+        in_frontier = (self._representation_matrix[rows, columns] != global_variables.UNKNOWN_CELL) \
+            & (self._information_gain[rows, columns] > 0)
+        relative_rows = (rows - self.origin[0]).tolist()
+        relative_columns = (columns - self.origin[1]).tolist()
+        for relative_pos, frontier in zip(zip(relative_rows, relative_columns), in_frontier.tolist()):
+            if frontier:
+                self._frontier.add(relative_pos)
+            else:
+                self._frontier.discard(relative_pos)
+
+    def _update_dispensers(self, rows, columns, old_values):
+        """update the dispenser registry after some cells of the map have been written
+
+        Args:
+            rows (int, np.array or slice): matrix rows of the written cells
+            columns (int, np.array or slice): matrix columns of the written cells
+            old_values (int or np.array): values of the cells before they were written
+        """
+        new_values = self._representation_matrix[rows, columns]
+        changed = (old_values != new_values) & (GridMap._is_dispenser(old_values) | GridMap._is_dispenser(new_values))
+        if not np.any(changed):
+            return
+        rows, columns, old_values, new_values = GridMap._select_written_cells(rows, columns, changed, old_values,
+                                                                              new_values)
+        for y, x, old_value, new_value in zip(rows, columns, old_values, new_values):
+            if GridMap._is_dispenser(old_value):
+                dispenser_type = self.get_dispenser_type(old_value)
+                self._dispensers[dispenser_type].discard(tuple(self._from_matrix_to_relative(np.array([y, x]))))
+                self._dispenser_arrays.pop(dispenser_type, None)
+            if GridMap._is_dispenser(new_value):
+                self._add_dispenser(new_value, (y, x))
+
+    @staticmethod
+    def _select_written_cells(rows, columns, selected, *values):
+        """select some of the cells written with _write_representation
+
+        Args:
+            rows (int, np.array or slice): matrix rows of the written cells
+            columns (int, np.array or slice): matrix columns of the written cells
+            selected (bool or np.array): mask of the cells to select, with the same shape of the written values
+            *values (np.array): values of the written cells to select as well
+
+        Returns:
+            list: 1-dimensional arrays with the rows, the columns and the values of the selected cells
+        """
+        if isinstance(rows, slice):
+            rows, columns = np.mgrid[rows, columns]
+        arrays = np.broadcast_arrays(rows, columns, selected, *values)
+        selected = arrays[2]
+        return [array[selected] for array in arrays[:2] + arrays[3:]]
+
+    def _add_dispenser(self, cell_value, matrix_pos):
+        """add the dispenser in matrix_pos to the registry"""
+        dispenser_type = self.get_dispenser_type(cell_value)
+        relative_pos = self._from_matrix_to_relative(np.array(matrix_pos))
+        self._dispensers.setdefault(dispenser_type, set()).add((int(relative_pos[0]), int(relative_pos[1])))
+        self._dispenser_arrays.pop(dispenser_type, None)
+
+    def _rebuild_goal_area(self):
+        """build the goal area registry (relative positions of the goal cells and their bounding box) from the whole
+        map"""
+        self._goal_cells = set()
+        self._goal_cells_array = None
+        self._goal_bounds = None
+        self._add_goal_cells(np.argwhere(self._representation_matrix == global_variables.GOAL_CELL))
+
+    def _update_goal_area(self, rows, columns, old_values):
+        """update the goal area registry after some cells of the map have been written
+
+        Args:
+            rows (int, np.array or slice): matrix rows of the written cells
+            columns (int, np.array or slice): matrix columns of the written cells
+            old_values (int or np.array): values of the cells before they were written
+        """
+        new_values = self._representation_matrix[rows, columns]
+        was_goal = old_values == global_variables.GOAL_CELL
+        is_goal = new_values == global_variables.GOAL_CELL
+        if not np.any(was_goal != is_goal):
+            return
+        rows, columns, was_goal, is_goal = GridMap._select_written_cells(rows, columns, was_goal != is_goal,
+                                                                         was_goal, is_goal)
+        removed = np.column_stack((rows[was_goal], columns[was_goal])) - self.origin
+        if len(removed) > 0:
+            self._goal_cells.difference_update(map(tuple, removed.tolist()))
+            self._goal_cells_array = None
+            self._goal_bounds = None  # it can only shrink, it is computed again when needed
+        self._add_goal_cells(np.column_stack((rows[is_goal], columns[is_goal])))
+
+    def _add_goal_cells(self, matrix_positions):
+        """add the goal cells in matrix_positions (shape (N, 2)) to the registry and extend the bounding box"""
+        if len(matrix_positions) == 0:
+            return
+        relative_positions = matrix_positions - self.origin
+        self._goal_cells.update(map(tuple, relative_positions.tolist()))
+        self._goal_cells_array = None
+        if self._goal_bounds is not None:
+            self._goal_bounds = np.concatenate((np.minimum(self._goal_bounds[:2], relative_positions.min(axis=0)),
+                                                np.maximum(self._goal_bounds[2:], relative_positions.max(axis=0))))
+
+    def get_goal_area_cells(self):
+        """get the relative positions of the known goal area cells
+
+        Returns:
+            np.array: relative positions [y, x] of the goal area cells sorted by y and then x, shape (N, 2)
+        """
+        if self._goal_cells_array is None:
+            self._goal_cells_array = np.array(sorted(self._goal_cells), dtype=int).reshape(-1, 2)
+        return self._goal_cells_array
+
+    def get_goal_area_bounds(self):
+        """get the bounding box of the known goal area cells
+
+        Returns:
+            np.array: relative positions of the top left and bottom right corners [top, left, bottom, right],
+                None if no goal area cell is known
+        """
+        if self._goal_bounds is None and len(self._goal_cells) > 0:
+            goal_cells = self.get_goal_area_cells()
+            self._goal_bounds = np.concatenate((goal_cells.min(axis=0), goal_cells.max(axis=0)))
+        return self._goal_bounds
+
+    @property
+    def is_at_goal_area(self):
+        """True if the agent is in a goal area cell"""
+        return (int(self._agent_position[0]), int(self._agent_position[1])) in self._goal_cells
+
+    def get_dispenser_positions(self, dispenser_type):
+        """get the relative positions of the known dispensers of a type
+
+        Args:
+            dispenser_type (str): the type of the dispensers (e.g. b1)
+
+        Returns:
+            np.array: relative positions [y, x] of the dispensers sorted by y and then x, shape (N, 2)
+        """
+        if dispenser_type not in self._dispenser_arrays:
+            positions = sorted(self._dispensers.get(dispenser_type, ()))
+            self._dispenser_arrays[dispenser_type] = np.array(positions, dtype=int).reshape(-1, 2)
+        return self._dispenser_arrays[dispenser_type]
 
     def _update_path_planner_representation(self, perception):
-        # Update temporary map used by path_planner to avoid obstacles
-        self._path_planner_representation = np.copy(self._representation)
+        """Update the temporary stuffs of the map used by path_planner to avoid obstacles: the agent, the entities and
+        the blocks that are not attached. The overlay of the previous step is removed and the new one is written, so
+        only the cells of the two overlays are written
+
+        Args:
+            perception (rhbp.perception_provider): the new perception of the agent
+        """
+        attached_positions = set((int(block._position[0]), int(block._position[1])) for block in self._attached_blocks)
+        perceived_positions = set((block.pos.y, block.pos.x) for block in perception.blocks)
+
         # add agent position
-        matrix_pos = self._from_relative_to_matrix(self._agent_position)
-        self._path_planner_representation[matrix_pos[0]][matrix_pos[1]] = global_variables.AGENT_CELL
+        positions = [self._agent_position]
+        values = [global_variables.AGENT_CELL]
 
         # update blocks
         for block in perception.blocks:
-            block_rel_to_agent = np.array([block.pos.y, block.pos.x])
-            attached = False
-            for attached_block in self._attached_blocks:
-                if np.array_equal(attached_block._position, block_rel_to_agent):
-                    attached = True
-            if not attached:
-                pos = self._from_relative_to_matrix(block_rel_to_agent, self._agent_position)
-
-                matrix_pos = self._from_relative_to_matrix(pos)
-                # first index --> y value, second  --> x value
-                self._path_planner_representation[matrix_pos[0]][
-                    matrix_pos[1]] = global_variables.BLOCK_CELL_STARTING_NUMBER + int(block.type[1])
+            if (block.pos.y, block.pos.x) not in attached_positions:
+                positions.append(np.array([block.pos.y, block.pos.x]) + self._agent_position)
+                values.append(global_variables.BLOCK_CELL_STARTING_NUMBER + int(block.type[1]))
 
         # TO SOLVE BUG WHEN AGENT THINKS TO HAVE BLOCKS ATTACHED THAT DO NOT EXIST
         # TODO check if this is still a problem
-        for attached_block in self._attached_blocks[:]:
-            block_exist = False
-            for block in perception.blocks:
-                block_rel_to_agent = np.array([block.pos.y, block.pos.x])
-                if np.array_equal(attached_block._position, block_rel_to_agent):
-                    block_exist = True
-            if not block_exist:
-                self._attached_blocks.remove(attached_block)
+        self._attached_blocks[:] = [attached_block for attached_block in self._attached_blocks
+                                    if (int(attached_block._position[0]), int(attached_block._position[1]))
+                                    in perceived_positions]
 
         # updates entities
         for entity in perception.entities:
             # It detects itself as an entity
             if entity.pos.y == 0 and entity.pos.x == 0:
                 continue
+            positions.append(np.array([entity.pos.y, entity.pos.x]) + self._agent_position)
+            values.append(global_variables.ENTITY_CELL)
 
-            pos = np.array([entity.pos.y, entity.pos.x]) + self._agent_position
-            matrix_pos = self._from_relative_to_matrix(pos)
+        self._set_overlay(np.array(positions, dtype=int).reshape(-1, 2),
+                          np.array(values, dtype=global_variables.CELL_DTYPE))
 
-            self._path_planner_representation[matrix_pos[0]][
-                matrix_pos[1]] = global_variables.ENTITY_CELL
+    def _set_overlay(self, positions, values):
+        """replace the overlay of temporary stuffs of the path planner map. The cells of the old overlay get back the
+        values of the representation, then the new values are written (the last one wins on the same cell)
 
-            # rospy.logdebug("temporary map: " + str(self._path_planner_representation))
+        Args:
+            positions (np.array): relative positions of the cells, shape (N, 2)
+            values (np.array): values of the cells
+        """
+        old_cells = self._from_relative_to_matrix(self._overlay_positions)
+        cells = self._from_relative_to_matrix(positions)
+        all_cells = np.concatenate((old_cells, cells))
+        old_walkable = self._path_planner_walkable[all_cells[:, 0], all_cells[:, 1]]
+
+        self._path_planner_matrix[old_cells[:, 0], old_cells[:, 1]] = \
+            self._representation_matrix[old_cells[:, 0], old_cells[:, 1]]
+        self._path_planner_matrix[cells[:, 0], cells[:, 1]] = values
+        # an overlay that didn't move doesn't change the walkable cells
+        walkable = GridPathPlanner.walkable_mask(self._path_planner_matrix[all_cells[:, 0], all_cells[:, 1]])
+        if np.any(old_walkable != walkable):
+            self._path_planner_walkable[all_cells[:, 0], all_cells[:, 1]] = walkable
+            self._path_planner_walkable_version += 1
+            self._placement_masks = None
+        self._overlay_positions = positions
+        self._overlay_values = values
 
     def _update_distances(self):
         """update the matrix of distances from the agent to all the walkable cells"""
-        dist_shape = self._representation.shape
-        self._distances = np.full((dist_shape[0], dist_shape[1]), -1, dtype=int)
-        # print(self._distances.shape)
-        # print(self._origin)
-        # print(self._agent_position)
         agent_in_matrix = self._from_relative_to_matrix(self._agent_position)
-        queue = deque([(agent_in_matrix, 0)])
-        while len(queue) > 0:
-            pos, dist = queue.popleft()
-            if self._distances[pos[0], pos[1]] == -1:  # to avoid infinite loop
-                self._distances[pos[0], pos[1]] = dist
-                for direction in global_variables.MOVING_DIRECTIONS:  # ADD ALSO ROTATIONS?
-                    new_pos = direction + pos
-                    if GridMap.coord_inside_matrix(new_pos, dist_shape):
-                        if self._get_value_of_cell(new_pos,self._distances) == global_variables.UNKNOWN_CELL:
-                            cell_value = self._get_value_of_cell(new_pos, self._path_planner_representation)
-                            if GridPathPlanner.is_walkable(cell_value):
-                                queue.append((new_pos, dist + 1))
+        key = (self._path_planner_walkable_version, int(agent_in_matrix[0]), int(agent_in_matrix[1]))
+        if key == self._distances_key:
+            return
+        self._distances = self._distance_field.update(self._path_planner_walkable, agent_in_matrix, self.origin)
+        self._distances_key = key
+
+    def _distances_are_updated(self):
+        """check if the distances have been computed from the current agent position on the current path planner map"""
+        if self._distances.shape != self._path_planner_walkable.shape:
+            return False
+        agent_in_matrix = self._from_relative_to_matrix(self._agent_position)
+        return self._distances[agent_in_matrix[0], agent_in_matrix[1]] == 0
+
+    def _get_path_from_distances(self, end):
+        """get the path of the agent (without blocks) to end, following the distances from the agent backwards
+
+        Args:
+            end (np.array): end position of the agent in matrix coordinates
+
+        Returns:
+            list: path in relative coordinates (as GridPathPlanner.astar), None if the distances are not updated or
+                end can't be reached
+        """
+        if not self._distances_are_updated():
+            return None
+        path = shortest_path(self._distances, end)
+        if path is None:
+            return None
+        return list(self.path_planner.transform_matrix_node_to_relative(np.asarray(path)[:, np.newaxis], self.origin))
 
     def get_move_direction(self, path_id, path_creation_function, parameters=None):
         """get n,s,e,w to move the agent along the path.
@@ -308,10 +732,9 @@ class GridMap():
                     if direction != 'unknown position':
                         next_configuration = None
                         if direction == 'cw' or direction == 'ccw':
-                            temp_blocks = copy.deepcopy(self._attached_blocks)
-                            for block in temp_blocks:
-                                block.rotate(rotate_direction=direction)
-                            next_configuration = self.get_agent_pos_and_blocks_array(attached_blocks=temp_blocks)
+                            shape, rotation_index = self._get_attached_shape()
+                            next_configuration = shape.configuration(self._agent_position,
+                                                                     shape.rotate_index(rotation_index, direction))
                         else:
                             temp_agent_pos = self._agent_position + global_variables.MOVEMENTS[direction]
                             next_configuration = self.get_agent_pos_and_blocks_array(agent_position=temp_agent_pos)
@@ -366,7 +789,8 @@ class GridMap():
         Returns:n,s,e or w or None
         """
         parameters = dict()
-        parameters["dispenser_pos"] = self._from_relative_to_matrix(subtask.closest_dispenser_position, self.goal_top_left)
+        if self.world_frame_known:
+            parameters["dispenser_pos"] = self._from_world_to_relative(subtask.closest_dispenser_position)
         direction = None
         path_id = None
         path_id, direction = self.get_move_direction(subtask.path_to_dispenser_id, self._get_path_to_reach_dispenser, parameters)
@@ -481,53 +905,96 @@ class GridMap():
         origin of the matrix
 
         Args:
-            relative_coord: (x,y) with respect to the origin of the map
+            relative_coord: (y,x) or array of coordinates of shape (N, 2) with respect to the origin of the map
             coord: the relative point of the coordinates
 
         Returns:
-            matrix_coord: (x',y') with respect to the origin of the matrix
+            matrix_coord: (y',x') or array of shape (N, 2) with respect to the origin of the matrix
         """
-
-        matrix_coord = np.copy(relative_coord)
-
         if coord is None:  # by default origin
-            matrix_coord = matrix_coord + self.origin
-        else:
-            matrix_coord = matrix_coord + coord
-
-        return matrix_coord
+            coord = self.origin
+        return np.asarray(relative_coord) + coord
 
     def _from_matrix_to_relative(self, matrix_coord, coord=None):
         """Reverse function of from_relative_to_matrix
 
         Args:
-            matrix_coord: (x,y) with respect to the origin of the matrix
+            matrix_coord: (y,x) or array of coordinates of shape (N, 2) with respect to the origin of the matrix
             coord: the relative point of the coordinates
         Returns:
-            relative_coord: (x',y') with respect to the origin of the map
+            relative_coord: (y',x') or array of shape (N, 2) with respect to the origin of the map
         """
-
-        relative_coord = np.copy(matrix_coord)
         if coord is None:
-            relative_coord = relative_coord - self.origin
-        else:
-            relative_coord = relative_coord - coord
+            coord = self.origin
+        return np.asarray(matrix_coord) - coord
+
+    @property
+    def world_frame_known(self):
+        """True if the world frame (relative to the top left of the goal area) is known"""
+        return self.goal_top_left is not None
+
+    def _get_world_frame_origin(self):
+        """get the origin of the world frame (goal_top_left) in relative coordinates
+
+        Raises:
+            ValueError: if the world frame is not known yet
+        """
+        if not self.world_frame_known:
+            raise ValueError('the world frame is not known, the top left of the goal area has not been found')
+        return np.asarray(self.goal_top_left)
+
+    def _from_world_to_relative(self, world_coord):
+        """translates coordinates of the world frame (relative to the top left of the goal area) to coordinates
+        relative to the origin of the map
+
+        Args:
+            world_coord (np.array): (y, x) or array of coordinates of shape (N, 2) in the world frame
+
+        Returns:
+            np.array: the coordinates relative to the origin of the map
+        """
+        return np.asarray(world_coord) + self._get_world_frame_origin()
+
+    def _from_relative_to_world(self, relative_coord):
+        """Reverse function of _from_world_to_relative
 
-        return relative_coord
+        Args:
+            relative_coord (np.array): (y, x) or array of coordinates of shape (N, 2) relative to the origin of the map
+
+        Returns:
+            np.array: the coordinates in the world frame
+        """
+        return np.asarray(relative_coord) - self._get_world_frame_origin()
+
+    def _from_world_to_matrix(self, world_coord):
+        """translates coordinates of the world frame (relative to the top left of the goal area) to matrix coordinates
+
+        Args:
+            world_coord (np.array): (y, x) or array of coordinates of shape (N, 2) in the world frame
+
+        Returns:
+            np.array: the coordinates in the matrix
+        """
+        return np.asarray(world_coord) + (self._get_world_frame_origin() + self.origin)
+
+    def _from_matrix_to_world(self, matrix_coord):
+        """Reverse function of _from_world_to_matrix
+
+        Args:
+            matrix_coord (np.array): (y, x) or array of coordinates of shape (N, 2) in the matrix
+
+        Returns:
+            np.array: the coordinates in the world frame
+        """
+        return np.asarray(matrix_coord) - (self._get_world_frame_origin() + self.origin)
 
     def list_from_relative_to_matrix(self, relative_coord_list):
-        """call from_relative_to_matrix on all the coordinates of a list"""
-        new_list = []
-        for coord in relative_coord_list:
-            new_list.append(self._from_relative_to_matrix(coord))
-        return np.array(new_list)
+        """call from_relative_to_matrix on a list of coordinates, returns an array of shape (N, 2)"""
+        return self._from_relative_to_matrix(np.asarray(relative_coord_list, dtype=int).reshape(-1, 2))
 
     def list_from_matrix_to_relative(self, matrix_coord_list):
-        """call from_matrix_to_relative on all the coordinates of a list"""
-        new_list = []
-        for coord in matrix_coord_list:
-            new_list.append(self._from_matrix_to_relative(coord))
-        return np.array(new_list)
+        """call from_matrix_to_relative on a list of coordinates, returns an array of shape (N, 2)"""
+        return self._from_matrix_to_relative(np.asarray(matrix_coord_list, dtype=int).reshape(-1, 2))
 
     def _update_agent_position(self, move=None):
         """update agents position in map and expand grid if sight is out of bounds
@@ -544,7 +1011,7 @@ class GridMap():
         agent_in_matrix = self._from_relative_to_matrix(self._agent_position)
         if move is not None:
             # Delete previous position of agent in map
-            self._representation[agent_in_matrix[0]][agent_in_matrix[1]] = 0
+            self._write_representation(agent_in_matrix[0], agent_in_matrix[1], global_variables.EMPTY_CELL)
             move_array = global_variables.MOVEMENTS[move]
             self._agent_position = self._agent_position + move_array
             agent_in_matrix = self._from_relative_to_matrix(self._agent_position)
@@ -556,7 +1023,7 @@ class GridMap():
                 self._expand_map(move)
 
             agent_in_matrix = self._from_relative_to_matrix(self._agent_position)
-            self._representation[agent_in_matrix[0]][agent_in_matrix[1]] = global_variables.AGENT_CELL
+            self._write_representation(agent_in_matrix[0], agent_in_matrix[1], global_variables.AGENT_CELL)
 
         else:
             pass
@@ -573,27 +1040,95 @@ class GridMap():
                              'w'], "Expansion direction needs to be 'n','e','s','w'. '{}' was provided".format(
             direction)
 
-        old_map_shape = self._representation.shape
-
         rospy.loginfo('old origin:{}'.format(self.origin))
-        # this is the fastest way to add a row / column to a numpy array
-        # see 'https://stackoverflow.com/questions/8486294/how-to-add-an-extra-column-to-a-numpy-array' if interested
-        if direction == 'n':
-            helper_map = np.full((old_map_shape[0] + 1, old_map_shape[1]), fill_value=global_variables.UNKNOWN_CELL)
-            helper_map[1:, :] = self._representation
-            self.origin = self.origin + np.array([1, 0])
-        if direction == 's':
-            helper_map = np.full((old_map_shape[0] + 1, old_map_shape[1]), fill_value=global_variables.UNKNOWN_CELL)
-            helper_map[:-1, :] = self._representation
-        if direction == 'e':
-            helper_map = np.full((old_map_shape[0], old_map_shape[1] + 1), fill_value=global_variables.UNKNOWN_CELL)
-            helper_map[:, :-1] = self._representation
-        if direction == 'w':
-            helper_map = np.full((old_map_shape[0], old_map_shape[1] + 1), fill_value=global_variables.UNKNOWN_CELL)
-            helper_map[:, 1:] = self._representation
-            self.origin = self.origin + np.array([0, 1])
+        self._grow_map(top=int(direction == 'n'), bottom=int(direction == 's'), left=int(direction == 'w'),
+                       right=int(direction == 'e'))
         rospy.loginfo('new origin:{}'.format(self.origin))
-        self._representation = helper_map
+
+    def _grow_map(self, top=0, bottom=0, left=0, right=0):
+        """Adds unknown rows / columns on the sides of the map and moves the origin accordingly.
+        The map and its walkable layer grow in their storage, so the whole map is copied only when the storage is full
+
+        Args:
+            top (int): rows to add on top
+            bottom (int): rows to add on the bottom
+            left (int): columns to add on the left
+            right (int): columns to add on the right
+        """
+        self._representation_matrix = self._representation_storage.grow(top, bottom, left, right)
+        self._walkable = self._walkable_storage.grow(top, bottom, left, right)
+        self._path_planner_matrix = self._path_planner_storage.grow(top, bottom, left, right)
+        self._path_planner_walkable = self._path_planner_walkable_storage.grow(top, bottom, left, right)
+        self._placement_masks = None
+        self._information_gain = self._gain_storage.grow(top, bottom, left, right)
+        self.origin = self.origin + np.array([top, left])
+        self.map_version += 1
+        self._walkable_changed()
+        self._path_planner_walkable_version += 1
+
+        # the new cells are unknown, so the information gain of the old cells doesn't change (the cells outside of the
+        # map were already counted as unknown). Only the one of the new cells is computed
+        rows, columns = self._representation.shape
+        for strip in [(0, top, 0, columns), (rows - bottom, rows, 0, columns), (top, rows - bottom, 0, left),
+                      (top, rows - bottom, columns - right, columns)]:
+            if strip[0] < strip[1] and strip[2] < strip[3]:
+                self._information_gain[strip[0]:strip[1], strip[2]:strip[3]] = self._count_unknown_in_vision(*strip)
+
+    def merge_map(self, external_map, external_land_mark):
+        """Merges the map of another agent in this map, using the top left of the goal area as common landmark.
+        The map grows in place to contain the external map and only the unknown cells are filled
+
+        Args:
+            external_map (np.array): the map of the other agent
+            external_land_mark (np.array): the top left of the goal area in external_map (matrix coordinates)
+        """
+        my_land_mark = self._from_relative_to_matrix(self.goal_top_left)
+        self._grow_map(*mergePadding(external_map.shape, self._representation.shape, external_land_mark, my_land_mark))
+        my_land_mark = self._from_relative_to_matrix(self.goal_top_left)
+        overlap_shift = my_land_mark - np.asarray(external_land_mark)
+        # only the window of the external map can change
+        window = (slice(overlap_shift[0], overlap_shift[0] + external_map.shape[0]),
+                  slice(overlap_shift[1], overlap_shift[1] + external_map.shape[1]))
+        if fillUnknown(external_map, self._representation_matrix, overlap_shift) == 0:
+            return  # nothing new in the external map
+
+        # the cells of the external map are not changed cells (see pop_changed_cells), the other agent sent them
+        self._walkable[window] = GridPathPlanner.walkable_mask(self._representation_matrix[window])
+        self.map_version += 1
+        self._walkable_changed()
+        self._path_planner_matrix[window] = self._representation_matrix[window]
+        self._path_planner_walkable[window] = self._walkable[window]
+        self._path_planner_walkable_version += 1
+        self._set_overlay(self._overlay_positions, self._overlay_values)
+        self._rebuild_dispensers()
+        self._rebuild_goal_area()
+        self._rebuild_information_gain()
+
+    def merge_cells(self, positions, values):
+        """Merges some cells of the map of another agent in this map, only the unknown cells are filled.
+        The map grows in place to contain the cells. Nothing is merged if the world frame is not known
+
+        Args:
+            positions (np.array): positions [y, x] of the cells relative to the top left of the goal area,
+                shape (N, 2). If a cell appears more than once, its last value is merged
+            values (np.array): values of the cells
+        """
+        if len(positions) == 0 or not self.world_frame_known:
+            return
+        _, last = np.unique(positions[::-1], axis=0, return_index=True)
+        positions, values = positions[::-1][last], values[::-1][last]
+        rows, columns = self._representation.shape
+        cells = self._from_world_to_matrix(positions)
+        top, left = cells.min(axis=0)
+        bottom, right = cells.max(axis=0) + 1
+        padding = (max(-top, 0), max(bottom - rows, 0), max(-left, 0), max(right - columns, 0))
+        if any(padding):
+            self._grow_map(*padding)
+
+        cells = self._from_world_to_matrix(positions)
+        unknown = (self._representation_matrix[cells[:, 0], cells[:, 1]] == global_variables.UNKNOWN_CELL) \
+            & (values != global_variables.UNKNOWN_CELL)
+        self._write_representation(cells[unknown, 0], cells[unknown, 1], values[unknown], track_changes=False)
 
     def _get_data_directory(self):
         """Returns Directory where map data is stored for plotting purposes"""
@@ -604,68 +1139,62 @@ class GridMap():
         return tmp_maps_path
 
     def _write_data_to_file(self):
-        """writes two dimensional np.array to .txt file named after agent and in data directory"""
+        """writes two dimensional np.array to .txt file named after agent and in data directory, if the map changed
+        since the last time"""
+        if self._dumped_map_version == self.map_version:
+            return
+        self._dumped_map_version = self.map_version
         map_copy = np.copy(self._representation)
         # TODO PRINT LIST OF DISPENSERS
         map_copy[self.origin[0],self.origin[1]] = 0
-        for d in self._dispensers:
-            pos = self._from_relative_to_matrix(d['pos'])
-            map_copy[pos[0], pos[1]] = 10
+        for dispenser_type in self._dispensers:
+            for pos in self._from_relative_to_matrix(self.get_dispenser_positions(dispenser_type)):
+                map_copy[pos[0], pos[1]] = 10
         np.savetxt(os.path.join(self.data_directory, '{}.txt'.format(self.agent_name)), map_copy, fmt='%i',
                    delimiter=',')
 
     ### EXPLORATION FUNCTIONALITIES ###
-    def _get_unknown_amount(self, position):
-        """calculate amount of unknown cells around a given cell
+    def _get_interesting_points(self):
+        """get the points of the frontier that can be reached and are close to a cell that can't be reached
+
+        Returns:
+            tuple: (points in matrix coordinates sorted by row and column (np.array of shape (N, 2)),
+                amount of unknown cells in vision range of each point (np.array of floats))
+        """
+        points = np.array(sorted(self._frontier), dtype=int).reshape(-1, 2) + self.origin
+        points = self._select_border_points(points)
+        return points, self._information_gain[points[:, 0], points[:, 1]].astype(float)
+
+    def _select_border_points(self, points):
+        """select the points that can be reached (distance from the agent > 0) and have a neighbor that can't be
+        reached (distance -1)
 
         Args:
-            map_representation (np.array):
-            position (tuple): tuple containing x,y coordinates
+            points (np.array): matrix coordinates, shape (N, 2)
 
         Returns:
-            int: amount of unknown cells around given position
+            np.array: the selected points
         """
-        unknown_count = 0
-        # loop through all cells that are in (theoretical) vision from specified position
-        # not considering vision hindering through obstacles
-        for j in range(-self.agent_vision, self.agent_vision + 1):
-            for i in range(-self.agent_vision, self.agent_vision + 1):
-                cell = position + np.array([j, i])
-                if 0 < GridMap.manhattan_distance(position, cell) <= self.agent_vision:
-                    if not GridMap.coord_inside_matrix(cell, self._representation.shape):
-                        unknown_count += 1
-                    else:
-                        if self._representation[cell[0], cell[1]] == global_variables.UNKNOWN_CELL:
-                            unknown_count += 1
-
-        return unknown_count
+        rows, columns = self._distances.shape if self._distances.ndim == 2 else (0, 0)
+        points = points[(points[:, 0] >= 0) & (points[:, 0] < rows) & (points[:, 1] >= 0) & (points[:, 1] < columns)]
+        points = points[self._distances[points[:, 0], points[:, 1]] > 0]
+        border = np.zeros(len(points), dtype=bool)
+        for direction in global_variables.MOVING_DIRECTIONS:
+            neighbors = points + direction
+            inside = (neighbors[:, 0] >= 0) & (neighbors[:, 0] < rows) & (neighbors[:, 1] >= 0) \
+                & (neighbors[:, 1] < columns)
+            border[inside] |= self._distances[neighbors[inside, 0], neighbors[inside, 1]] == -1
+        return points[border]
 
     def _set_goal_top_left(self):
-        """Set the goal_top_left variable with the relative coordinates of the top left corner of the goal area.
-        With this we can merge maps using this fixed common point.
+        """Set the goal_top_left variable with the relative coordinates of the top left corner of the goal area
+        (of its bounding box, see get_goal_area_bounds). With this we can merge maps using this fixed common point.
 
         Returns: void
 
         """
-        start_area = False
-        top = 10000
-        left = 10000
-        for i in range(self._representation.shape[0]):
-            goal_present_in_row = False
-            for j in range(self._representation.shape[1]):
-                value = self._get_value_of_cell(np.array([i, j]))
-                if value == global_variables.GOAL_CELL:
-                    start_area = True
-                    goal_present_in_row = True
-                    if i < top:
-                        top = i
-                    if j < left:
-                        left = j
-                    break
-            if start_area and not goal_present_in_row:
-                break
-
-        self.goal_top_left = self._from_matrix_to_relative(np.array([top, left]))
+        bounds = self.get_goal_area_bounds()
+        self.goal_top_left = None if bounds is None else np.copy(bounds[:2])
 
     def get_distance_and_path(self, a, b, return_path=False):
         """returns the distance and path from a point to another
@@ -690,6 +1219,7 @@ class GridMap():
         if dist != -1 or return_path:
             path = self.path_planner.astar(
                 maze=self._path_planner_representation,
+                walkable=self._path_planner_walkable,
                 origin=self.origin,
                 start=np.array([a_matrix_representation]),
                 end=np.array([b_matrix_representation]))
@@ -714,41 +1244,15 @@ class GridMap():
 
         # keep track of best suitable points for exploration
 
-        # select all the points that are close to an unknown cell
-        possible_points = []
-        unknown_counts = []
-        for y, x in np.ndindex(self._distances.shape):
-            if self._distances[y][x] == -1:
-                for direction in global_variables.MOVING_DIRECTIONS:
-                    cell_coord = np.array([y + direction[0], x + direction[1]])
-                    # Make sure in range
-                    if GridMap.coord_inside_matrix(cell_coord, self._distances.shape):
-                        # Adherence cell is walkable
-                        if self._distances[cell_coord[0], cell_coord[1]] > 0:
-                            possible_points.append(cell_coord)
-
-        # remove duplicates
-        possible_points.sort(key=lambda x: (x[0], x[1]))
-        i = 0
-        while i < len(possible_points) - 1:
-            a = possible_points[i]
-            b = possible_points[i + 1]
-            if a[0] == b[0] and a[1] == b[1]:
-                del possible_points[i]
-            else:
-                i += 1
-        goal_area_in_border = False
-
-        #select only the points that are are interesting to explore
-        interesting_points = []
-        for point in possible_points:
-            unknown_count = float(self._get_unknown_amount(point))
-            if self._get_value_of_cell(point) == global_variables.GOAL_CELL:
-                unknown_count *= 10000 # goal area cell are the most important to explore
-                goal_area_in_border = True
-            if unknown_count > 0:
-                interesting_points.append(point)
-                unknown_counts.append(unknown_count)
+        # select the points that are close to a cell that can't be reached. Among them only the points in the frontier
+        # (the known cells with unknown cells in vision range) are interesting to explore
+        interesting_points, unknown_counts = self._get_interesting_points()
+
+        # goal area cells close to a cell that can't be reached
+        goal_cells = self.get_goal_area_cells() + self.origin
+        goal_area_in_border = len(self._select_border_points(goal_cells)) > 0
+        unknown_counts[self._representation[interesting_points[:, 0], interesting_points[:, 1]]
+                       == global_variables.GOAL_CELL] *= 10000  # goal area cell are the most important to explore
 
         # DISCOVERING GOAL AREA
         if not self.goal_area_fully_discovered:
@@ -759,41 +1263,27 @@ class GridMap():
                 self._set_goal_top_left()
 
         # calculate path length between current position and potential exploration points
-        # and choose the one with shortest path
-        shortest_path = 1000000
+        # and choose the one with the best score (unknown cells / path length), then the one with shortest path,
+        # then a random one
         best_point = None
-        best_score = -1
-
-        # print ("points:" + str(possible_points))
-        for i in range(len(interesting_points)):
-            # print(point)
-            # print(path)
-            length = self._distances[interesting_points[i][0],interesting_points[i][1]]
-            if length == 0:  # to avoid division per zero
-                lenght = 100
-            new_score = unknown_counts[i]/length
-            # print (length)
-            update_new_highscore = False
-            if new_score > best_score:
-                update_new_highscore = True
-            elif new_score == best_score and length <= shortest_path:  # we prefer a shorter path
-                if length == shortest_path:
-                    if bool(random.getrandbits(1)):
-                        update_new_highscore = True
-                else:
-                    update_new_highscore = True
-            if update_new_highscore:
-                best_point = interesting_points[i]
-                shortest_path = length
-                best_score = new_score
+        if len(interesting_points) > 0:
+            lengths = self._distances[interesting_points[:, 0], interesting_points[:, 1]]
+            scores = unknown_counts / lengths
+            best = np.flatnonzero(scores == scores.max())
+            best = best[lengths[best] == lengths[best].min()]
+            best_point = interesting_points[random.choice(best)]
 
         # Avoid stuck behavior
         if best_point is not None:
-            best_path = self.path_planner.astar(
-                maze=self._path_planner_representation,
-                origin=self.origin,
-                start=np.array([self._from_relative_to_matrix(self._agent_position)]),
-                end=np.array([best_point]))
+            # the distances from the agent already contain the path to the best point
+            best_path = self._get_path_from_distances(best_point)
+            if best_path is None:
+                best_path = self.path_planner.astar(
+                    maze=self._path_planner_representation,
+                    walkable=self._path_planner_walkable,
+                    origin=self.origin,
+                    start=np.array([self._from_relative_to_matrix(self._agent_position)]),
+                    end=np.array([best_point]))
             # TODO somewhere if best_score = 0 always we should set the exploring sensor to 0
         else:
             # TODO this will be used as a flag to avoid the agent to get stuck
@@ -826,24 +1316,24 @@ class GridMap():
         """
 
         lowest_dist_disp = 10000
-        lowest_dist_goal = 10000
         common_meeting_point = None
         dispenser_position = []
         dist_to_dispenser = []
         assigned_agents = []
-        possible_meeting_points = []
+
+        if not self.world_frame_known:
+            return None, None  # the dispensers of the subtasks are in the world frame
 
         for sub in task.sub_tasks:
             if True:    # Right now we keep common meeting point to be between the two closest dispensers
             # if sub.complete is not True:
-                # transform from relative to top_left to matrix
-                dispenser_rel = self._from_relative_to_matrix(sub.closest_dispenser_position, self.goal_top_left)
-                # transform from relative to matrix
-                dispenser_position.append(self._from_relative_to_matrix(dispenser_rel))
+                dispenser_position.append(sub.closest_dispenser_position)
                 # distance to dispensers
                 dist_to_dispenser.append(sub.distance_to_dispenser)
                 # name of agents assigned
                 assigned_agents.append(sub.assigned_agent)
+        # transform from world to matrix
+        dispenser_position = self._from_world_to_matrix(np.array(dispenser_position, dtype=int).reshape(-1, 2))
 
         # Check if dispensers are actually in its position
         for dispenser in dispenser_position:
@@ -902,22 +1392,18 @@ class GridMap():
             upper_col_limit -= added_row_and_col
             lower_col_limit += added_row_and_col
 
-        # Get points as the same distance as middle_point_distance
-        for row_index, row in enumerate(lowest_dist_matrix):
-            # only points inside the row bounds
-            if lower_row_limit >= row_index >= upper_row_limit:
-                # only points inside the column bounds
-                for col_index, cell_value in enumerate(row):
-                    if lower_col_limit >= col_index >= upper_col_limit:
-                        if cell_value == middle_point_distance:
-                            possible_meeting_points.append([row_index, col_index])
-
-        # Get the point with the lowest distance to the goal top left corner
-        for point in possible_meeting_points:
-            dist_to_goal = abs(point[0] - goal_top_left_matrix[0]) + abs(point[1] - goal_top_left_matrix[1])
-            if dist_to_goal < lowest_dist_goal:
-                lowest_dist_goal = dist_to_goal
-                common_meeting_point = point
+        # Get points as the same distance as middle_point_distance, only inside the row and column bounds
+        upper_row_limit = max(upper_row_limit, 0)
+        upper_col_limit = max(upper_col_limit, 0)
+        bounded_dist_matrix = lowest_dist_matrix[upper_row_limit:lower_row_limit + 1,
+                                                 upper_col_limit:lower_col_limit + 1]
+        possible_meeting_points = np.argwhere(bounded_dist_matrix == middle_point_distance) \
+            + np.array([upper_row_limit, upper_col_limit])
+
+        # Get the point with the lowest distance to the goal top left corner (the first one in case of ties)
+        if len(possible_meeting_points) > 0:
+            dist_to_goal = np.abs(possible_meeting_points - goal_top_left_matrix).sum(axis=1)
+            common_meeting_point = possible_meeting_points[np.argmin(dist_to_goal)]
 
         return assigned_agents, common_meeting_point
 
@@ -1021,6 +1507,7 @@ class GridMap():
                 # Check if the position of the submitting agent is reachable (inside the wall boundaries)
                 path_to_submitting_agent_position = self.path_planner.astar(
                     maze=self._representation,
+                    walkable=self._walkable,
                     origin=self.origin,
                     start=np.array([self._from_relative_to_matrix(self._agent_position)]),
                     end=np.array([submitting_agent_meeting_position]))
@@ -1124,14 +1611,20 @@ class GridMap():
         else:
             dispenser_pos = parameters['dispenser_pos']
         agent_pos = [self._from_relative_to_matrix(self._agent_position)]
+        # without attached blocks the path can be read from the distances from the agent
+        use_distances = len(self._attached_blocks) == 0 and self._distances_are_updated()
         for direction in global_variables.MOVING_DIRECTIONS:
             dispenser_pos_in_matrix = [self._from_relative_to_matrix(dispenser_pos+direction)]
-            path = self.path_planner.astar(
-                maze=self._path_planner_representation,
-                origin=self.origin,
-                start=np.array(agent_pos),
-                end=np.array(dispenser_pos_in_matrix)
-            )
+            if use_distances:
+                path = self._get_path_from_distances(dispenser_pos_in_matrix[0])
+            else:
+                path = self.path_planner.astar(
+                    maze=self._path_planner_representation,
+                    walkable=self._path_planner_walkable,
+                    origin=self.origin,
+                    start=np.array(agent_pos),
+                    end=np.array(dispenser_pos_in_matrix)
+                )
             if GridPathPlanner.is_valid_path(path):
                 return path
         # TODO IF PATH IS NOT VALID? CHANGE DISPENSER LOCATION? yes
@@ -1145,19 +1638,15 @@ class GridMap():
         Returns(tuple): (position,distance), (None,9999) if didn't find a valid dispenser
         """
         min_dist = 9999
-        pos = None
-        for dispenser in self._dispensers:
-            if dispenser['type'] == required_type:  # check if the type is the one we need
-                pos_matrix = self._from_relative_to_matrix(dispenser['pos'])
-                dist = self._distances[pos_matrix[0], pos_matrix[1]]
-
-                if dist < min_dist:  # see if the distance is minimum and save it
-                    min_dist = dist
-                    pos = pos_matrix
-        if pos is not None:
-            return self._from_matrix_to_relative(pos), min_dist
-        else:
-            return None, min_dist
+        positions = self.get_dispenser_positions(required_type)
+        if len(positions) > 0:
+            # distances of all the dispensers of the required type
+            positions_matrix = self._from_relative_to_matrix(positions)
+            distances = self._distances[positions_matrix[:, 0], positions_matrix[:, 1]]
+            closest = np.argmin(distances)  # the first one in case of ties
+            if distances[closest] < min_dist:
+                return np.copy(positions[closest]), int(distances[closest])
+        return None, min_dist
 
     def distance_matrix(self, start_point):
         """Calculate a distances matrix between a starting point and everywhere else
@@ -1168,26 +1657,52 @@ class GridMap():
         Returns:
             distance_matrix (np.array): distances matrix from starting point
         """
-        #dist_shape = self._path_planner_representation.shape
-        dist_shape = self._representation.shape
-        distances = np.full((dist_shape[0], dist_shape[1]), -1, dtype=int)
-        #start_point_matrix = self._from_relative_to_matrix(start_point)
         # Dispenser are already in matrix notations
-        start_point_matrix = start_point
-        queue = deque([(start_point_matrix, 0)])
-        while len(queue) > 0:
-            pos, dist = queue.popleft()
-            if distances[pos[0], pos[1]] == -1:  # to avoid infinite loop
-                distances[pos[0], pos[1]] = dist
-                for direction in global_variables.MOVING_DIRECTIONS:
-                    new_pos = direction + pos
-                    if self.coord_inside_matrix(new_pos, dist_shape):
-                        if distances[new_pos[0], new_pos[1]] == -1:
-                            #cell_value = self._path_planner_representation[new_pos[0], new_pos[1]]
-                            cell_value = self._representation[new_pos[0], new_pos[1]]
-                            if GridPathPlanner.is_walkable(cell_value):
-                                queue.append((new_pos, dist + 1))
-        return distances
+        return self._get_static_distance_field(('point', int(start_point[0]), int(start_point[1])), start_point)
+
+    def get_goal_area_distance_field(self):
+        """get the distances on the fixed map from the top left cell of the goal area (None if it is not known)"""
+        if self.goal_top_left is None:
+            return None
+        goal_top_left = self._from_relative_to_matrix(self.goal_top_left)
+        return self._get_static_distance_field(('goal', int(goal_top_left[0]), int(goal_top_left[1])), goal_top_left)
+
+    def get_dispenser_distance_field(self, dispenser_type):
+        """get the distances on the fixed map from the closest known dispenser of a type (None if there is none)"""
+        positions = self.get_dispenser_positions(dispenser_type)
+        if len(positions) == 0:
+            return None
+        key = ('dispenser', dispenser_type, positions.tobytes())  # the dispensers of the type can change
+        return self._get_static_distance_field(key, self._from_relative_to_matrix(positions))
+
+    def get_distance_to_goal_area(self, position):
+        """get the distance on the fixed map between a position (relative coordinates) and the top left cell of the
+        goal area, -1 if it can't be reached or the goal area is not known"""
+        field = self.get_goal_area_distance_field()
+        position = self._from_relative_to_matrix(position)
+        if field is None or not GridMap.coord_inside_matrix(position, field.shape):
+            return -1
+        return int(field[position[0], position[1]])
+
+    def _get_static_distance_field(self, key, sources):
+        """get a distance field on the fixed map (_walkable). The fields are cached and computed again only when the
+        walkable cells or the extent of the map change
+
+        Args:
+            key (tuple): identifier of the field in the cache
+            sources (np.array): matrix coordinates of the sources of the field (see wavefront)
+
+        Returns:
+            np.array: read-only matrix of distances, -1 for the cells that can't be reached
+        """
+        if self._static_fields_version != self._walkable_version:
+            self._static_fields = {}
+            self._static_fields_version = self._walkable_version
+        if key not in self._static_fields:
+            field = wavefront(self._walkable, sources)
+            field.flags.writeable = False  # shared between the callers
+            self._static_fields[key] = field
+        return self._static_fields[key]
 
     ### GO TO MEETING POINT FUNCTIONS ###
 
@@ -1214,6 +1729,7 @@ class GridMap():
         print (final_pos_in_matrix)
         path = self.path_planner.astar(
             maze=self._path_planner_representation,
+            walkable=self._path_planner_walkable,
             origin=self.origin,
             start=agent_pos,
             end=final_pos_in_matrix
@@ -1222,53 +1738,102 @@ class GridMap():
         return path
 
     def _get_path_to_reach_goal_area(self, parameters):
-        """get path from agent to the goal area"""
-        best_path = None
+        """get path from agent to the goal area, trying the goal area cells starting from the closest"""
         agent_pos = self.get_agent_pos_and_blocks_array()
         agent_pos_matrix = self.list_from_relative_to_matrix(agent_pos)
-        goal_area = np.array(self.goal_top_left) + np.array([1, 1])
-        # TODO should check for all the goal area cells (starting from the closest)
-        possible_ends = self.get_possible_configurations_in_point(goal_area)
-        for end in possible_ends:
-            goal_area_matrix = self.list_from_relative_to_matrix(end)
-            path = self.path_planner.astar(
-                maze=self._path_planner_representation,
-                origin=self.origin,
-                start=agent_pos_matrix,
-                end=goal_area_matrix
-            )
-            if GridPathPlanner.is_valid_path(path):
-                best_path = path
-                break
-        return best_path
+        for goal_area in self._get_goal_area_ends():
+            possible_ends = self.get_possible_configurations_in_point(goal_area)
+            for end in possible_ends:
+                goal_area_matrix = self.list_from_relative_to_matrix(end)
+                path = self.path_planner.astar(
+                    maze=self._path_planner_representation,
+                    walkable=self._path_planner_walkable,
+                    origin=self.origin,
+                    start=agent_pos_matrix,
+                    end=goal_area_matrix
+                )
+                if GridPathPlanner.is_valid_path(path):
+                    return path
+        return None
+
+    def _get_goal_area_ends(self):
+        """get the goal area cells where the agent can go, starting from the closest. Only the
+        global_variables.GOAL_AREA_ENDS closest cells are returned, every end can cost up to 4 A* searches
+
+        Returns:
+            np.array: relative positions of the closest goal area cells that the agent can reach (if the distances from
+                the agent are updated) sorted by distance, the cell in [1, 1] from the top left corner if there are none
+        """
+        goal_cells = self.get_goal_area_cells()
+        if len(goal_cells) > 0 and self._distances_are_updated():
+            goal_cells_matrix = goal_cells + self.origin
+            distances = self._distances[goal_cells_matrix[:, 0], goal_cells_matrix[:, 1]]
+            reachable = distances >= 0
+            goal_cells = goal_cells[reachable][np.argsort(distances[reachable], kind='mergesort')]
+            goal_cells = goal_cells[:global_variables.GOAL_AREA_ENDS]
+        else:
+            goal_cells = goal_cells[:0]
+        if len(goal_cells) == 0 and self.goal_top_left is not None:
+            goal_cells = np.array([np.array(self.goal_top_left) + np.array([1, 1])])
+        return goal_cells
 
     def get_possible_configurations_in_point(self, point):
         """get all the possible configuration of the agents and blocks attached in a point
             point(np.array): the point that the agent must reach
         """
         possible_configurations = []
-        # copy the blocks_attached array
-        blocks = copy.deepcopy(self._attached_blocks)
+        shape, rotation_index = self._get_attached_shape()
 
-        # create a configuration and add it if it is free
+        # create a configuration for each clockwise rotation and add it if it is free
         for i in range(4):
-            configuration = self.get_agent_pos_and_blocks_array(agent_position=point, attached_blocks=blocks)
+            configuration = shape.configuration(point, (rotation_index + i) % 4)
             if self.is_configuration_free(configuration):
                 possible_configurations.append(configuration)
-            for block in blocks: # the last rotation is not needed
-                block.rotate(rotate_direction='cw')
         return possible_configurations
 
     def is_configuration_free(self, configuration):
         """check if a configuration of the agents and blocks attached in a point is a valid end point"""
-        for coord in configuration:
-            matrix_coord = self._from_relative_to_matrix(coord)
-            if not self.coord_inside_matrix(matrix_coord, self._path_planner_representation.shape):
+        shape, rotation_index = self._get_attached_shape()
+        configuration_index = shape.configuration_index(configuration)
+        if configuration_index is not None:
+            # the configuration is a rotation of the attached blocks, a single lookup is enough
+            agent_in_matrix = self._from_relative_to_matrix(configuration[0])
+            if not self.coord_inside_matrix(agent_in_matrix, self._path_planner_representation.shape):
                 return False
-            if not GridPathPlanner.is_walkable(self._get_value_of_cell(matrix_coord,maze=self._path_planner_representation)):
-                return False
-        return True
+            return bool(self._get_placement_masks()[configuration_index, agent_in_matrix[0], agent_in_matrix[1]])
 
+        matrix_coords = self.list_from_relative_to_matrix(configuration)
+        if (matrix_coords < 0).any() or (matrix_coords >= self._path_planner_representation.shape).any():
+            return False
+        return bool(self._path_planner_walkable[matrix_coords[:, 0], matrix_coords[:, 1]].all())
+
+
+    def _get_attached_shape(self):
+        """get the shape of the attached blocks and the rotation index of their current positions.
+        The rotations are computed again only if the attached blocks changed (not if they were rotated)
+
+        Returns:
+            tuple: (shape (BlockShape), rotation_index (int))
+        """
+        blocks = [block._position for block in self._attached_blocks]
+        rotation_index = self._attached_shape.rotation_index(blocks)
+        if rotation_index is None:
+            self._attached_shape = BlockShape(blocks)
+            rotation_index = 0
+        return self._attached_shape, rotation_index
+
+    def _get_placement_masks(self):
+        """get the placement masks (see BlockShape.placement_masks) of the attached blocks on the path planner map.
+        They are computed again only if the attached blocks or the path planner map changed
+
+        Returns:
+            np.array: boolean array of shape (4, rows, columns)
+        """
+        shape, rotation_index = self._get_attached_shape()
+        if self._placement_masks is None or self._placement_masks_shape is not shape:
+            self._placement_masks = shape.placement_masks(self._path_planner_walkable)
+            self._placement_masks_shape = shape
+        return self._placement_masks
 
     def get_agent_pos_and_blocks_array(self, agent_position=None, attached_blocks=None):
         """get agent with blocks array in relative coordinates"""
@@ -1276,13 +1841,9 @@ class GridMap():
             attached_blocks = self._attached_blocks
         if agent_position is None:
             agent_position = self._agent_position
-        list = [np.copy(agent_position)]
-        for block in attached_blocks:
-            # transform the coordinates of the block in coordinates relative to the agent
-            block_in_relative = self._from_relative_to_matrix(block._position, agent_position)
-            list.append(block_in_relative)
-
-        return np.array(list)
+        # transform the coordinates of the blocks in coordinates relative to the agent
+        blocks = np.array([block._position for block in attached_blocks], dtype=int).reshape(-1, 2)
+        return np.vstack(([agent_position], self._from_relative_to_matrix(blocks, agent_position)))
 
     ### static methods ###
 
@@ -1322,6 +1883,12 @@ class GridMap():
         else:
             return False
 
+    @staticmethod
+    def _is_dispenser(cell_value):
+        """vectorized check if cells are dispensers"""
+        return (global_variables.DISPENSER_STARTING_NUMBER <= cell_value) \
+            & (cell_value < global_variables.BLOCK_CELL_STARTING_NUMBER)
+
     @staticmethod
     def get_block_type(cell_value):
         if cell_value >= global_variables.BLOCK_CELL_STARTING_NUMBER:
@@ -1,28 +1,37 @@
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 import numpy as np
+import heapq
+import itertools
 import global_variables
+from block_shape import BlockShape
 
 direction_values = [[-1, 0], [1, 0], [0, 1], [0, -1], 'ccw', 'cw']  # maze(rows, col) = agent(y, x)
 direction_list = ['n', 's', 'e', 'w', 'ccw', 'cw']
+key_moves = [(-1, 0, 0), (1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, -1), (0, 0, 1)]  # same order as direction_values
 
 
 class GridPathPlanner():
-    class Node():
-        """A node class for A* Pathfinding"""
+    class Node(object):
+        """A node class for A* Pathfinding
 
-        def __init__(self, parent=None, position=None):
+        The configuration of the agent and the blocks attached is encoded in key as (y, x, rotation): the agent
+        cell in matrix notation and the rotation index of the blocks in the BlockShape of the search
+        """
+        __slots__ = ('parent', 'key', 'g', 'h', 'f')
+
+        def __init__(self, parent=None, key=None):
             self.parent = parent
-            self.position = position
+            self.key = key
 
             self.g = 0  # G is the distance between the current node and the start node.
             self.h = 0  # H is the heuristic : estimated distance from the current node to the end node.
             self.f = 0  # F is the total cost of the node. F= G + H
 
         def __eq__(self, other):
-            return self.position == other.position
+            return self.key == other.key
 
-    def astar(self, maze, origin, start, end):
+    def astar(self, maze, origin, start, end, walkable=None):
         """ Return a path list in relative coordinates given a map (maze), an starting point and an end point
 
         Args:
@@ -32,110 +41,101 @@ class GridPathPlanner():
                 attached to it (in matrix notation)
             end (np.array): ending position in the map of the object compose by the agent and all the blocks
                 attached to it (in matrix notation)
+            walkable (np.array): walkable mask of maze (see walkable_mask), computed from maze if not given
 
         Returns:
             list: path in relative coordinates (to the origin)
 
         """
+        if walkable is None:
+            walkable = GridPathPlanner.walkable_mask(maze)
 
         # Check if the end point is not a free cell
         for element in end:
-            end_pos_value = maze[element[0]][element[1]]
-            if not GridPathPlanner.is_walkable(end_pos_value):
+            if not walkable[element[0], element[1]]:
                 print ("invalid End point")
                 return 'invalid end'
 
-        # Create start and end node
-        start_node = self.Node(None, start)
-        start_node.g = start_node.h = start_node.f = 0
-        end_node = self.Node(None, end)
-        end_node.g = end_node.h = end_node.f = 0
-
-        # Initialize both open and closed list
-        open_list = []  # include adjacent nodes that has to be evaluated (f value)
-        closed_list = []  # include nodes from the open_list which has been evaluated (lowest f value)
-
-        # Add the start node
-        open_list.append(start_node)
+        # Encode start and end as (y, x, rotation) keys
+        start = np.asarray(start)
+        end = np.asarray(end)
+        shape = BlockShape.from_configuration(start)
+        canonical = shape.canonical
+        end_rotation = shape.configuration_index(end)
+        if end_rotation is None:
+            return None     # the end is not a rotation of the starting configuration
+        start_key = (int(start[0][0]), int(start[0][1]), 0)
+        end_key = (int(end[0][0]), int(end[0][1]), end_rotation)
+        agent_end_y, agent_end_x = end_key[0], end_key[1]
+
+        # fits[r][y][x] is True if the agent can be in (y, x) with the blocks in rotation r.
+        # from here on only python integers and lists are used
+        fits = shape.placement_masks(walkable).tolist()
+        rows = len(fits[0])
+        columns = len(fits[0][rows - 1])
+
+        # open_heap is a priority queue ordered by f value (ties broken by insertion order),
+        # open_g and closed are hash maps keyed by the configuration of agent + blocks
+        start_node = self.Node(None, start_key)
+        counter = itertools.count()
+        open_heap = [(start_node.f, next(counter), start_node)]
+        open_g = {start_key: start_node.g}
+        closed = set()
 
         # Loop until you find the end
-        while len(open_list) > 0:
-
-            # Get the current node
-            current_node = open_list[0]
-            current_index = 0
-            for index, item in enumerate(open_list):  # search for the minimum f value among all nodes in open_list
-                if item.f < current_node.f:
-                    current_node = item
-                    current_index = index
+        while len(open_heap) > 0:
 
-            # Pop current (lowest f value node) off open list, add to closed list
-            open_list.pop(current_index)
-            closed_list.append(current_node)
+            # Pop current (lowest f value node) off the open heap, add to closed set
+            current_node = heapq.heappop(open_heap)[2]
+            current_key = current_node.key
+            if current_key in closed:
+                continue    # an outdated entry of a node that has been reached with a lower g value
+            closed.add(current_key)
+            open_g.pop(current_key, None)
 
             # Found the goal
-            if (current_node == end_node).all():
+            if current_key == end_key:
                 path = []
                 current = current_node
                 while current is not None:
-                    # Transform path to relative
-                    relative_pos = self.transform_matrix_node_to_relative(current.position, origin)
-                    path.append(relative_pos)
+                    y, x, rotation = current.key
+                    path.append(shape.configuration(np.array([y, x]), rotation))
                     current = current.parent
-                return path[::-1]  # return reversed path
-
-            # Generate children
-            children = []
+                # Transform path to relative, all the nodes at once
+                return list(self.transform_matrix_node_to_relative(np.array(path[::-1]), origin))  # reversed path
 
             # Check adjacent cells (n, s, e , w) and rotations (left, right)
-            for new_position in direction_values:
-
-                # Get node position
-                if new_position == 'ccw' or new_position == 'cw':
-                    node_position = self.rotation(current_node.position, new_position)
-                else:
-                    node_position = self.translation(current_node.position, new_position)
-
-                for element in node_position:
-                    # Make sure in range
-                    if element[0] > (len(maze) - 1) or element[0] < 0 or element[1] \
-                            > (len(maze[len(maze) - 1]) - 1) or element[1] < 0:
-                        break
-                    # Make sure walkable terrain
-                    elif not GridPathPlanner.is_walkable(maze[element[0]][element[1]]):
-                        break
-                else:
-                    # Create new node
-                    new_node = self.Node(current_node, node_position)
-
-                    # Append
-                    children.append(new_node)
-
-            # Loop through children
-            for child in children:
-                # Child is on the closed list
-                for closed_child in closed_list:
-                    if (child == closed_child).all():
-                        break
-                else:
-                    # Create the f, g, and h values
-                    child.g = current_node.g + 1
+            current_y, current_x, current_rotation = current_key
+            for move_y, move_x, rotate in key_moves:
+                child_y = current_y + move_y
+                child_x = current_x + move_x
+                child_rotation = canonical[(current_rotation + rotate) % 4]
+                if rotate != 0 and child_rotation == current_rotation:
+                    continue    # rotating a symmetric configuration doesn't change it
+
+                # Make sure in range and walkable terrain for the agent and all the blocks
+                if 0 <= child_y < rows and 0 <= child_x < columns and fits[child_rotation][child_y][child_x]:
+                    # Child is on the closed list
+                    child_key = (child_y, child_x, child_rotation)
+                    if child_key in closed:
+                        continue
+
+                    # check if the new path to children is worst or equal than
+                    # one already in the open list (by measuring g value)
+                    child_g = current_node.g + 1
+                    if child_key in open_g and child_g >= open_g[child_key]:
+                        continue
+
+                    # Create new node with the f, g, and h values
+                    child = self.Node(current_node, child_key)
+                    child.g = child_g
                     # H: Manhattan distance to end point
-                    agent_current_pos = child.position[0]
-                    agent_end_pos = end_node.position[0]
-                    child.h = abs(agent_current_pos[0] - agent_end_pos[0]) \
-                              + abs(agent_end_pos[1] - agent_current_pos[1])
+                    child.h = abs(child_y - agent_end_y) + abs(agent_end_x - child_x)
                     child.f = child.g + child.h
 
-                    # Child is already in the open list
-                    for open_node in open_list:
-                        # check if the new path to children is worst or equal than
-                        # one already in the open_list (by measuring g value)
-                        if (child == open_node).all() and child.g >= open_node.g:
-                            break
-                    else:
-                        # Add the child to the open list
-                        open_list.append(child)
+                    # Add the child to the open list
+                    open_g[child_key] = child.g
+                    heapq.heappush(open_heap, (child.f, next(counter), child))
 
     @staticmethod
     def is_walkable(cell):
@@ -154,6 +154,22 @@ class GridPathPlanner():
 
         return False
 
+    @staticmethod
+    def walkable_mask(maze):
+        """ Vectorized version of is_walkable for a whole map
+
+        Args:
+            maze (np.array): map matrix
+
+        Returns:
+            np.array: boolean matrix, True where the cell is walkable
+
+        """
+        maze = np.asarray(maze)
+        return (maze == global_variables.EMPTY_CELL) | (maze == global_variables.GOAL_CELL) \
+            | (maze == global_variables.AGENT_CELL) | ((maze >= global_variables.DISPENSER_STARTING_NUMBER)
+                                                       & (maze < global_variables.BLOCK_CELL_STARTING_NUMBER))
+
     def translation(self, node, direction):
         """Apply a translation (n, s, e, w) to a node (Agent + blocks attached) and return its new position
 
@@ -183,72 +199,40 @@ class GridPathPlanner():
             direction (string): Direction of the rotation (cw = Clockwise or ccw = Counterclockwise)
 
         Returns:
-            np.array: Node rotated in matrix notation
+            np.array: Node rotated in the same type as given (relative or matrix)
 
         """
-        # Rotation transformations
-        rotate_left = [-1, 1]
-        rotate_right = [1, -1]
-
-        # Transform to relative coordinates
-        origin = node[0]
-        node_rotated = self.transform_matrix_node_to_relative(node, origin)
-
-        # Check direction of rotation
-        if direction == 'ccw':
-            rotation = rotate_left
-        else:   # cw
-            rotation = rotate_right
-
-        # Apply rotation: swap (y,x) * rotate_left/right + origin
-        for i in range(1, node_rotated.shape[0]):
-            # swap
-            node_element = node_rotated[i]
-            node_element = node_element[::-1]
-            # Multiply by rotation transformation
-            node_rotated_y = node_element[0]*rotation[0]
-            node_rotated_x = node_element[1]*rotation[1]
-            node_rotated[i] = [node_rotated_y, node_rotated_x]
-
-        # Convert back to map coordinates
-        node_rotated = self.transform_relative_node_to_matrix(node_rotated, origin)
-
-        return node_rotated
+        shape = BlockShape.from_configuration(node)
+
+        return shape.configuration(node[0], BlockShape.rotate_index(0, direction))
 
     def transform_matrix_node_to_relative(self, node_matrix, pos_init):
         """Transform a node (agent + block) position in matrix coordinates to relative coordinates
             (agent position = (0,0))
 
         Args:
-            node_matrix (np.array): node in matrix coordinates
+            node_matrix (np.array): node in matrix coordinates, array of shape (N, 2) (or of nodes, (M, N, 2))
             pos_init(np.array): position at the node initialization in matrix coordinates
 
         Returns:
-            np.array: node in relative coordinates (agent position = (0,0)
+            np.array: node in relative coordinates (agent position = (0,0), with the same shape of node_matrix
 
         """
-
-        node_rel = np.copy(node_matrix)
-        node_rel = node_rel - pos_init
-
-        return node_rel
+        return np.asarray(node_matrix) - pos_init
 
     def transform_relative_node_to_matrix(self, node_rel, pos_init):
         """Transform a node (agent + block) position in relative coordinates (agent position = (0,0)) to
             map coordinates
 
         Args:
-            node_rel (np.array): node in relative coordinates
+            node_rel (np.array): node in relative coordinates, array of shape (N, 2) (or of nodes, (M, N, 2))
             pos_init (np.array): position at the node initialization in matrix coordinates
 
         Returns:
-            np.array: node in matrix coordinates
+            np.array: node in matrix coordinates, with the same shape of node_rel
 
         """
-        node_matrix = np.copy(node_rel)
-        node_matrix = node_matrix + pos_init
-
-        return node_matrix
+        return np.asarray(node_rel) + pos_init
 
     def next_move_direction(self, actual_pos, path):
         """ Return the next move or rotate direction to perform with respect to a given path and agent position
@@ -308,9 +292,10 @@ class GridPathPlanner():
 
         # Check if diff is rotation
         if np.sum(diff[0]) == 0:    # first node is equal in a rotation
+            shape = BlockShape.from_configuration(actual_pos)
             for rotation in ['ccw', 'cw']:
-                block_rotate = self.rotation(actual_pos, rotation)
-                if (block_rotate == next_pos).all():
+                block_rotate = shape.configuration(actual_pos[0], BlockShape.rotate_index(0, rotation))
+                if np.array_equal(block_rotate, next_pos):
                     next_action = rotation
                     return next_action
 
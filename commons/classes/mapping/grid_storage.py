@@ -0,0 +1,73 @@
+""" This module contains the storage of the map matrices, that can grow on every side without copying the map every time """
+
+import numpy as np
+
+
+class GrowableGrid(object):
+    """Matrix that grows on every side in amortized O(1) per added row or column.
+
+    The matrix is a window (view) of a bigger buffer. When it grows, the window is moved over the free space of the
+    buffer, that is already filled with fill_value. Only when there is no more space the buffer is reallocated,
+    doubling its size and leaving free space around the matrix, and the matrix is copied.
+    Views returned by matrix are not valid anymore after the matrix grows.
+    """
+
+    def __init__(self, matrix, fill_value):
+        """
+        Args:
+            matrix (np.array): initial content of the matrix, the dtype of the storage is the one of the matrix
+            fill_value: value of the new cells
+        """
+        self.fill_value = fill_value
+        self.reset(matrix)
+
+    def reset(self, matrix):
+        """replace the matrix with a copy of the given one (that can have a different shape)"""
+        matrix = np.asarray(matrix)
+        self._allocate(matrix.shape, matrix.dtype)
+        self.matrix[:] = matrix
+
+    @property
+    def shape(self):
+        """shape of the matrix"""
+        return self._rows, self._columns
+
+    @property
+    def matrix(self):
+        """view of the matrix in the buffer"""
+        return self._buffer[self._top:self._top + self._rows, self._left:self._left + self._columns]
+
+    def grow(self, top=0, bottom=0, left=0, right=0):
+        """add rows and columns filled with fill_value on the sides of the matrix
+
+        Args:
+            top (int): rows to add on top
+            bottom (int): rows to add on the bottom
+            left (int): columns to add on the left
+            right (int): columns to add on the right
+
+        Returns:
+            np.array: the view of the grown matrix
+        """
+        buffer_rows, buffer_columns = self._buffer.shape
+        if top > self._top or left > self._left or self._top + self._rows + bottom > buffer_rows \
+                or self._left + self._columns + right > buffer_columns:
+            old = self.matrix
+            self._allocate((self._rows + top + bottom, self._columns + left + right), self._buffer.dtype)
+            self._buffer[self._top + top:self._top + top + old.shape[0],
+                         self._left + left:self._left + left + old.shape[1]] = old
+        else:
+            self._top -= top
+            self._left -= left
+            self._rows += top + bottom
+            self._columns += left + right
+        return self.matrix
+
+    def _allocate(self, shape, dtype):
+        """allocate a buffer with the double of the size needed and put the matrix in the middle of it"""
+        rows, columns = shape
+        self._buffer = np.full((2 * rows + 2, 2 * columns + 2), self.fill_value, dtype=dtype)
+        self._top = rows // 2 + 1
+        self._left = columns // 2 + 1
+        self._rows = rows
+        self._columns = columns
@@ -0,0 +1,30 @@
+""" This module contains the vectorized count of cells in the vision range of every cell, used for the information gain
+of the exploration """
+
+import numpy as np
+
+
+def diamond_count(mask, radius):
+    """Counts for every cell the True cells of mask at manhattan distance between 1 and radius (the vision range).
+
+    Every row of the diamond is a contiguous range of columns, so it is summed with two lookups in the cumulative sums
+    of the rows of mask: the whole count takes 2 * radius + 1 array operations.
+
+    Args:
+        mask (np.array): boolean matrix with a border of radius cells, that is counted but doesn't get a count
+        radius (int): radius of the diamond
+
+    Returns:
+        np.array: matrix of counts, with the shape of mask without the border
+    """
+    rows, columns = mask.shape[0] - 2 * radius, mask.shape[1] - 2 * radius
+    # row_sums[y, x] is the number of True cells of row y before column x
+    row_sums = np.zeros((mask.shape[0], mask.shape[1] + 1), dtype=int)
+    np.cumsum(mask, axis=1, out=row_sums[:, 1:])
+
+    counts = -mask[radius:radius + rows, radius:radius + columns].astype(int)  # the center is not counted
+    for offset_y in range(-radius, radius + 1):
+        width = radius - abs(offset_y)
+        row = row_sums[radius + offset_y:radius + offset_y + rows]
+        counts += row[:, radius + width + 1:radius + width + 1 + columns] - row[:, radius - width:radius - width + columns]
+    return counts
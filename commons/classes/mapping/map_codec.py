@@ -0,0 +1,73 @@
+""" This module contains the binary format of the maps sent between the agents.
+
+A message is a fixed header followed by the compressed values of the matrix:
+- header: version of the format, code of the dtype of the values, rows, columns and landmark (y, x) of the matrix,
+  little endian (see HEADER)
+- payload: the values in row order, in the narrowest dtype that can hold them, compressed with zlib.
+  The maps are mostly long runs of unknown and empty cells, so they compress very well
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+# version of the format, increased every time the format changes
+VERSION = 1
+# version, dtype code, rows, columns, landmark y, landmark x
+HEADER = struct.Struct('<BBiiii')
+# dtypes of the payload, the index in the list is the code in the header
+DTYPES = [np.dtype('<i1'), np.dtype('<i2'), np.dtype('<i4')]
+COMPRESSION_LEVEL = 6
+
+
+def encode(matrix, land_mark=(0, 0)):
+    """Encodes a matrix of integers (a map or a list of cells) in the binary format
+
+    Args:
+        matrix (np.array): 2 dimensional matrix of integers
+        land_mark (np.array): landmark of the matrix (e.g. the top left of the goal area of a map)
+
+    Returns:
+        str: the encoded matrix
+    """
+    matrix = np.asarray(matrix)
+    dtype_code = _narrowest_dtype_code(matrix)
+    header = HEADER.pack(VERSION, dtype_code, matrix.shape[0], matrix.shape[1], int(land_mark[0]), int(land_mark[1]))
+    payload = matrix.astype(DTYPES[dtype_code]).tobytes()
+    return header + zlib.compress(payload, COMPRESSION_LEVEL)
+
+
+def decode(data):
+    """Decodes a matrix encoded with encode
+
+    Args:
+        data (str): the encoded matrix
+
+    Returns:
+        tuple: (matrix (np.array) with the dtype of the payload, land_mark (np.array))
+
+    Raises:
+        ValueError: if the header is not valid (e.g. another version of the format)
+    """
+    version, dtype_code, rows, columns, land_mark_y, land_mark_x = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError('map codec version {} is not supported (expected {})'.format(version, VERSION))
+    if dtype_code >= len(DTYPES):
+        raise ValueError('unknown dtype code {}'.format(dtype_code))
+    if rows < 0 or columns < 0:
+        raise ValueError('invalid shape ({}, {})'.format(rows, columns))
+    payload = zlib.decompress(data[HEADER.size:])
+    matrix = np.frombuffer(payload, dtype=DTYPES[dtype_code]).reshape(rows, columns)
+    return matrix, np.array([land_mark_y, land_mark_x])
+
+
+def _narrowest_dtype_code(matrix):
+    """get the code of the narrowest dtype of the payload that can hold all the values of the matrix"""
+    if matrix.size == 0:
+        return 0
+    low, high = matrix.min(), matrix.max()
+    for code, dtype in enumerate(DTYPES):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return code
+    raise ValueError('the values of the matrix don\'t fit in {}'.format(DTYPES[-1]))
@@ -1,19 +1,54 @@
 """ This module contains the class that manages the map merge between the agents """
 
-from classes.mapping.map_merge import mapMerge
+import struct
+import threading
+import zlib
+
 import numpy as np
 import rospy
 
+import global_variables
+import map_codec
+
 
 class MapCommunication:
     """ Once the goal area is discovered, the map is sent to a shared ros topic. The maps are saved in a buffer when received.
     As first step the agents will empty the map buffer and merge the maps with their personal one.
-    """
+    The buffer keeps for each agent only its latest keyframe and the deltas received after it: the older messages are
+    dropped when they arrive, without decoding them, so a step merges at most one keyframe and one group of deltas
+    per agent.
+
+    To save bandwidth and merge time, every step an agent sends only the cells of its map that changed since the last
+    message (delta), with the position relative to the top left of the goal area. The whole map (keyframe) is sent
+    every global_variables.MAP_KEYFRAME_STEPS steps and when another agent requests it. The messages of an agent have
+    a sequence number: an agent that misses some of them (or starts listening late) requests a keyframe.
+    Maps and cells are sent in the binary format of map_codec.
 
-    map_messages_buffer = []
+    If global_variables.MERGE_MAPS_IN_BACKGROUND is True, a worker thread decodes the received messages as soon as they
+    arrive and stages their cells. At the start of the step, map_merge only takes the staged cells and merges them in
+    the local map, in the order of agent and sequence number.
+    """
 
     def __init__(self,rhbp_agent_istance):
         self.agent = rhbp_agent_istance
+        self._seq = 0  # sequence number of the next message sent
+        self._steps_since_keyframe = None  # None if no keyframe has been sent yet
+        self._received_seq = {}  # agent id -> sequence number of the last message merged
+
+        # buffer of the received messages, written by the subscriber thread and emptied by the step
+        self._lock = threading.Lock()
+        self._keyframes = {}  # agent id -> latest keyframe
+        self._deltas = {}  # agent id -> deltas received after the keyframe
+        self._keyframe_requested = False
+
+        # cells decoded by the merge worker, see _merge_worker
+        self._staged_cells = []  # (agent id, sequence number, positions, values)
+        self._messages_received = threading.Event()
+        if global_variables.MERGE_MAPS_IN_BACKGROUND:
+            worker = threading.Thread(target=self._merge_worker, name='map_merge_worker')
+            worker.daemon = True
+            worker.start()
+
         self._pub_map = self.agent._communication.start_map(self._callback_map)
 
     def map_merge(self):
@@ -22,50 +57,248 @@ class MapCommunication:
         Returns: void
         """
 
-        # process the maps in the buffer
-        for msg in self.map_messages_buffer[:]:
-            msg_id = msg.message_id
-            map_from = msg.agent_id
-            map_value = msg.map
-            map_lm_x = msg.lm_x
-            map_lm_y = msg.lm_y
-            map_rows = msg.rows
-            map_columns = msg.columns
-
-            if map_from != self.agent._agent_name and self.agent.local_map.goal_area_fully_discovered:
-                # map received
-                maps = np.fromstring(map_value, dtype=int).reshape(map_rows, map_columns)
-                rospy.logdebug(maps)
-                map_received = np.copy(maps)
-                # landmark received
-                lm_received = np.array([map_lm_y, map_lm_x])
-                # own landmark
-                lm_own = self.agent.local_map._from_relative_to_matrix(self.agent.local_map.goal_top_left)
-                # do map merge
-                origin_own = np.copy(self.agent.local_map.origin)
-                merged_map, merged_origin = mapMerge(map_received, self.agent.local_map._representation, lm_received, lm_own,
-                                                     origin_own)
-                self.agent.local_map._representation = np.copy(merged_map)
-                self.agent.local_map.origin = np.copy(merged_origin)
-
-            # remove map from the buffer as it has been processed
-            self.map_messages_buffer.remove(msg)
+        if global_variables.MERGE_MAPS_IN_BACKGROUND:
+            self._merge_staged_cells()
+            return
+
+        for map_from, keyframe, deltas in self._take_messages():
+            keyframe, cells = self._decode_messages(map_from, keyframe, deltas)
+            if keyframe is not None:
+                self._merge_keyframe(*keyframe)
+            if cells is not None:
+                self._merge_deltas(cells)
+
+    def _take_messages(self):
+        """ Empties the buffer and checks the sequence numbers of the messages, requesting a keyframe to the agents
+        whose messages are missing
+
+        Returns:
+            list: (agent id, keyframe (None if there is no keyframe), deltas sorted by sequence number) of each agent,
+                sorted by agent id. Empty if the goal area is not discovered
+        """
+
+        with self._lock:
+            keyframes, self._keyframes = self._keyframes, {}
+            deltas, self._deltas = self._deltas, {}
+
+        if not self.agent.local_map.goal_area_fully_discovered:
+            return []
+
+        # the agents are processed in a fixed order, so that the result doesn't depend on the arrival times
+        messages = []
+        for map_from in sorted(set(keyframes) | set(deltas)):
+            last_seq = self._received_seq.get(map_from)
+            keyframe = keyframes.get(map_from)
+            if keyframe is not None:
+                last_seq = keyframe.seq if last_seq is None else max(last_seq, keyframe.seq)
+            # the duplicated and late deltas are already merged or superseded by the keyframe
+            sender_deltas = dict((msg.seq, msg) for msg in deltas.get(map_from, [])
+                                 if last_seq is None or msg.seq > last_seq)
+            sender_deltas = [sender_deltas[seq] for seq in sorted(sender_deltas)]
+            if len(sender_deltas) > 0:
+                # the deltas can be merged even if some messages are missing, the keyframe will fill the gap
+                if last_seq is None or [msg.seq for msg in sender_deltas] \
+                        != list(range(last_seq + 1, last_seq + 1 + len(sender_deltas))):
+                    self._request_keyframe(map_from)
+                last_seq = sender_deltas[-1].seq
+            self._received_seq[map_from] = last_seq
+            messages.append((map_from, keyframe, sender_deltas))
+        return messages
+
+    def _merge_worker(self):
+        """ Body of the merge worker thread: decodes the messages when they arrive and stages their cells
+
+        Returns: void
+        """
+
+        while True:
+            self._messages_received.wait()
+            self._messages_received.clear()
+            try:
+                self._stage_messages()
+            except Exception as e:
+                # the thread must not die, or the maps of the other agents would not be merged anymore
+                rospy.logerr('{} failed to stage the received maps: {}'.format(self.agent._agent_name, e))
+
+    def _stage_messages(self):
+        """ Decodes the messages in the buffer and stages their cells (see _decode_messages)
+
+        Returns: void
+        """
+
+        staged_cells = []
+        for map_from, keyframe_msg, deltas in self._take_messages():
+            keyframe, cells = self._decode_messages(map_from, keyframe_msg, deltas)
+            if keyframe is not None:
+                map_received, lm_received = keyframe
+                known = np.argwhere(map_received != global_variables.UNKNOWN_CELL)
+                staged_cells.append((map_from, keyframe_msg.seq, known - lm_received,
+                                     map_received[known[:, 0], known[:, 1]]))
+            if cells is not None:
+                # the cells of the deltas are in order of sequence number
+                staged_cells.append((map_from, deltas[0].seq, cells[:, :2], cells[:, 2]))
+        with self._lock:
+            self._staged_cells.extend(staged_cells)
+
+    def _merge_staged_cells(self):
+        """ Merges in the local map the cells staged by the merge worker
+
+        Returns: void
+        """
+
+        with self._lock:
+            staged_cells, self._staged_cells = self._staged_cells, []
+        if len(staged_cells) == 0:
+            return
+        staged_cells.sort(key=lambda cells: cells[:2])
+        positions = np.concatenate([cells[2] for cells in staged_cells]).astype(int)
+        values = np.concatenate([cells[3] for cells in staged_cells]).astype(global_variables.CELL_DTYPE)
+        self.agent.local_map.merge_cells(positions, values)
+
+    def _merge_keyframe(self, map_received, lm_received):
+        """ Merges the whole map of another agent
+
+        Args:
+            map_received (np.array): the decoded map of the keyframe
+            lm_received (np.array): the top left of the goal area in map_received
+
+        Returns: void
+        """
+
+        # map received, converted from the message dtype to the one of the local map
+        map_received = map_received.astype(global_variables.CELL_DTYPE)
+        rospy.logdebug(map_received)
+        # do map merge, the local map grows in place
+        self.agent.local_map.merge_map(map_received, lm_received)
+
+    def _merge_deltas(self, cells):
+        """ Merges the changed cells of the map of another agent
+
+        Args:
+            cells (np.array): the decoded cells of the deltas of the agent in order of sequence number. Each row is
+                [y, x, value] with the position relative to the top left of the goal area
+
+        Returns: void
+        """
+
+        self.agent.local_map.merge_cells(cells[:, :2], cells[:, 2].astype(global_variables.CELL_DTYPE))
+
+    def _decode_messages(self, map_from, keyframe, deltas):
+        """ Decodes the keyframe and the deltas of an agent. The messages that can't be decoded are dropped (see
+        _decode), the deltas all together because the other deltas could be overwritten by the missing one, and a
+        keyframe is requested once to the agent to fill the gap
+
+        Args:
+            map_from (string): id of the agent
+            keyframe (map_communication): the keyframe message, None if there is no keyframe
+            deltas (list): the delta messages sorted by sequence number
+
+        Returns:
+            tuple: (keyframe: (map, land_mark) or None, cells of the deltas: np.array of rows [y, x, value] or None)
+        """
+
+        decoded_keyframe = None if keyframe is None else self._decode(keyframe)
+        decoded_deltas = [self._decode(msg, columns=3) for msg in deltas]
+        dropped = keyframe is not None and decoded_keyframe is None
+        cells = None
+        if any(decoded is None for decoded in decoded_deltas):
+            dropped = True
+        elif len(decoded_deltas) > 0:
+            cells = np.concatenate([decoded[0].astype(int) for decoded in decoded_deltas])
+        if dropped:
+            self._request_keyframe(map_from)
+        return decoded_keyframe, cells
+
+    def _decode(self, msg, columns=None):
+        """ Decodes the map of a message. The messages that can't be decoded (corrupted or sent in another version of
+        the format) are logged and dropped
+
+        Args:
+            msg (map_communication): the message
+            columns (int): expected number of columns of the map (e.g. 3 for the cells of a delta), None if any
+
+        Returns:
+            tuple: (matrix, land_mark) as map_codec.decode, None if the map can't be decoded
+        """
+
+        try:
+            matrix, land_mark = map_codec.decode(msg.map)
+            if columns is not None and matrix.shape[1] != columns:
+                raise ValueError('{} columns instead of {}'.format(matrix.shape[1], columns))
+            return matrix, land_mark
+        except (ValueError, zlib.error, struct.error) as e:
+            rospy.logwarn('{} drops the map {} of {}: {}'.format(self.agent._agent_name, msg.seq, msg.agent_id, e))
+            return None
+
+    def _request_keyframe(self, agent_id):
+        """ Ask an agent to send its whole map
+
+        Args:
+            agent_id (string): id of the agent
+
+        Returns: void
+        """
+
+        rospy.logdebug('{} requests the map of {}'.format(self.agent._agent_name, agent_id))
+        self.agent._communication.send_map(self._pub_map, '', 0, 0, 0, 0, request_keyframe_from=agent_id)
 
     def publish_map(self):
-        """ Send the map to the shared ros topic
+        """ Send the changes of the map to the shared ros topic, or the whole map when a keyframe is due
 
         Returns: void
         """
 
-        map = self.agent.local_map._representation
-        top_left_corner = self.agent.local_map._from_relative_to_matrix(self.agent.local_map.goal_top_left) # top left corner of the goal area is used as common landmark
-        self.agent._communication.send_map(self._pub_map, map.tostring(), top_left_corner[0], top_left_corner[1],
-                                     map.shape[0], map.shape[1])  
+        local_map = self.agent.local_map
+        if not local_map.world_frame_known:
+            return  # the maps are sent in the world frame
+        if self._steps_since_keyframe is not None:
+            self._steps_since_keyframe += 1
+        with self._lock:
+            keyframe_requested, self._keyframe_requested = self._keyframe_requested, False
+        if keyframe_requested or self._steps_since_keyframe is None \
+                or self._steps_since_keyframe >= global_variables.MAP_KEYFRAME_STEPS:
+            local_map.pop_changed_cells()  # they are in the keyframe
+            _, map, _ = local_map.get_map_snapshot()
+            top_left_corner = local_map._from_relative_to_matrix(local_map.goal_top_left) # top left corner of the goal area is used as common landmark
+            self.agent._communication.send_map(self._pub_map, map_codec.encode(map, top_left_corner),
+                                               top_left_corner[0], top_left_corner[1], map.shape[0], map.shape[1],
+                                               seq=self._seq, keyframe=True)
+            self._steps_since_keyframe = 0
+        else:
+            positions, values = local_map.pop_changed_cells()
+            if len(positions) == 0:
+                return  # nothing to send, the sequence number doesn't change
+            cells = np.column_stack((local_map._from_relative_to_world(positions), values))
+            self.agent._communication.send_map(self._pub_map, map_codec.encode(cells),
+                                               0, 0, cells.shape[0], cells.shape[1], seq=self._seq, keyframe=False)
+        self._seq += 1
 
     def _callback_map(self, msg):
-        """ Add the received maps in the buffer
+        """ Add the received maps in the buffer, dropping the ones that are superseded by a newer keyframe and the deltas
+        that are already merged.
+        It is called by the subscriber thread
 
         Returns: void
         """
 
-        self.map_messages_buffer.append(msg)
\ No newline at end of file
+        map_from = msg.agent_id
+        if map_from == self.agent._agent_name:
+            return
+        with self._lock:
+            if msg.request_keyframe_from:
+                # keyframe request
+                if msg.request_keyframe_from == self.agent._agent_name:
+                    self._keyframe_requested = True
+            elif msg.keyframe:
+                keyframe = self._keyframes.get(map_from)
+                if keyframe is None or msg.seq > keyframe.seq:
+                    self._keyframes[map_from] = msg
+                    self._deltas[map_from] = [delta for delta in self._deltas.get(map_from, []) if delta.seq > msg.seq]
+            else:
+                # drop the duplicated and late deltas (_take_messages drops them too, the last sequence number could
+                # change in the meanwhile)
+                keyframe = self._keyframes.get(map_from)
+                last_seq = self._received_seq.get(map_from)
+                if (keyframe is None or msg.seq > keyframe.seq) and (last_seq is None or msg.seq > last_seq):
+                    self._deltas.setdefault(map_from, []).append(msg)
+        self._messages_received.set()
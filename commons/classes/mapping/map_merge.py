@@ -22,37 +22,15 @@ def mapMerge(external_map, my_map, external_land_mark, my_land_mark, my_origin):
     #goal_landmark = 3
 
     # Check rows and columns added in the merge map
-    top_rows_to_add = int(external_land_mark[0] - my_land_mark[0])
-    if top_rows_to_add < 0:
-        top_rows_to_add = 0
-
-    bottom_rows_to_add = int(external_map.shape[0] - external_land_mark[0]) - int(my_map.shape[0] - my_land_mark[0])
-    if bottom_rows_to_add < 0:
-        bottom_rows_to_add = 0
-    
-    left_columns_to_add = int(external_land_mark[1] - my_land_mark[1])
-    if left_columns_to_add < 0:
-        left_columns_to_add = 0
-
-    right_columns_to_add = int(external_map.shape[1] - external_land_mark[1]) - int(my_map.shape[1] - my_land_mark[1])
-    if right_columns_to_add < 0:
-        right_columns_to_add = 0
-
+    top_rows_to_add, bottom_rows_to_add, left_columns_to_add, right_columns_to_add = \
+        mergePadding(external_map.shape, my_map.shape, external_land_mark, my_land_mark)
 
     # Fill extra columns and rows with -1
-    fill_top = np.full((top_rows_to_add, my_map.shape[1]), -1)
-    my_map = np.r_[fill_top, my_map]
-
-    fill_bot = np.full((bottom_rows_to_add, my_map.shape[1]), -1)
-    my_map = np.r_[my_map, fill_bot]
-
-    fill_left = np.full((my_map.shape[0], left_columns_to_add), -1)
-    my_map = np.c_[fill_left, my_map]
-
-    fill_right = np.full((my_map.shape[0], right_columns_to_add), -1)
-    my_map = np.c_[my_map, fill_right]
-
-    #showSingleMap(m2)
+    padded_map = np.full((my_map.shape[0] + top_rows_to_add + bottom_rows_to_add,
+                          my_map.shape[1] + left_columns_to_add + right_columns_to_add), -1, dtype=my_map.dtype)
+    padded_map[top_rows_to_add:top_rows_to_add + my_map.shape[0],
+               left_columns_to_add:left_columns_to_add + my_map.shape[1]] = my_map
+    my_map = padded_map
 
     # get new coordinates of landmarks of m2
     my_land_mark = (my_land_mark[0] + top_rows_to_add, my_land_mark[1] + left_columns_to_add)
@@ -63,20 +41,61 @@ def mapMerge(external_map, my_map, external_land_mark, my_land_mark, my_origin):
     overlap_shift = my_land_mark - external_land_mark
     # print("overlap_shift: " + str(overlap_shift))
 
+    fillUnknown(external_map, my_map, overlap_shift)
 
-    #showSingleMap(m2)
-    #showSingleMap(m1)
+    return my_map, new_origin
 
-    for i in range(external_map.shape[0]):
-        for j in range(external_map.shape[1]):
-            cell_value = external_map[i, j]
 
-            if my_map[i+overlap_shift[0], j+overlap_shift[1]] == -1:
-                my_map[i+overlap_shift[0], j+overlap_shift[1]] = cell_value
+def mergePadding(external_map_shape, my_map_shape, external_land_mark, my_land_mark):
+    """
+    computes how many rows and columns my map needs on each side to contain the external map
+    Args:
+        external_map_shape(tuple): the shape of the map of the other agent
+        my_map_shape(tuple): the shape of my map
+        external_land_mark(np.array): the top left of the goal area of external_map
+        my_land_mark(np.array): the top left of the goal area of my_map
 
-    return my_map, new_origin
-    #showSingleMap(m2)
+    Returns:
+        tuple:(top_rows_to_add, bottom_rows_to_add, left_columns_to_add, right_columns_to_add)
+    """
+    top_rows_to_add = int(external_land_mark[0] - my_land_mark[0])
+    if top_rows_to_add < 0:
+        top_rows_to_add = 0
+
+    bottom_rows_to_add = int(external_map_shape[0] - external_land_mark[0]) - int(my_map_shape[0] - my_land_mark[0])
+    if bottom_rows_to_add < 0:
+        bottom_rows_to_add = 0
+
+    left_columns_to_add = int(external_land_mark[1] - my_land_mark[1])
+    if left_columns_to_add < 0:
+        left_columns_to_add = 0
 
+    right_columns_to_add = int(external_map_shape[1] - external_land_mark[1]) - int(my_map_shape[1] - my_land_mark[1])
+    if right_columns_to_add < 0:
+        right_columns_to_add = 0
+
+    return top_rows_to_add, bottom_rows_to_add, left_columns_to_add, right_columns_to_add
+
+
+def fillUnknown(external_map, my_map, overlap_shift):
+    """
+    copies in place the cells of external_map on the unknown cells of my_map, with one masked assignment on the window
+    of my_map covered by external_map
+    Args:
+        external_map(np.array): the map of the other agent
+        my_map(np.array): my map, big enough to contain external_map
+        overlap_shift(np.array): position of the top left of external_map in my_map
+
+    Returns:
+        int: number of cells of my_map that changed
+    """
+    window = my_map[overlap_shift[0]:overlap_shift[0] + external_map.shape[0],
+                    overlap_shift[1]:overlap_shift[1] + external_map.shape[1]]
+    unknown = window == -1
+    changed = np.count_nonzero(unknown & (external_map != -1))
+    if changed > 0:
+        np.copyto(window, external_map, where=unknown, casting='unsafe')
+    return changed
 
 
 def showSingleMap(map):
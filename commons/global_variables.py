@@ -4,6 +4,7 @@ import numpy as np
 DEBUG_MODE = False
 LIVE_PLOTTING = True
 DUMP_CLASS = False
+CHECK_INCREMENTAL_DISTANCES = False  # compare the repaired distance field with the full recompute at every step
 
 # movements and directions useful variables
 MOVING_DIRECTIONS = [[-1, 0], [1, 0], [0, 1], [0, -1]]
@@ -16,6 +17,16 @@ MOVEMENTS = {
 }
 string_directions = ['n', 's', 'w', 'e']
 
+# dtypes of the map matrices. The cell values fit in 16 bits, the distances could need more
+CELL_DTYPE = np.int16
+DISTANCE_DTYPE = np.int32
+# the agents send only the cells of the map that changed, and the whole map (keyframe) every MAP_KEYFRAME_STEPS steps
+MAP_KEYFRAME_STEPS = 20
+# decode and stage the maps received in a background thread, instead of during the step
+MERGE_MAPS_IN_BACKGROUND = False
+# goal area cells (the closest ones) tried as end of the path to the goal area, see GridMap._get_goal_area_ends
+GOAL_AREA_ENDS = 3
+
 # Cells values
 EMPTY_CELL = 0
 UNKNOWN_CELL = -1
@@ -0,0 +1,46 @@
+import pytest
+import numpy as np
+from classes.mapping.block_shape import BlockShape
+from classes.mapping.grid_path_planner import GridPathPlanner
+
+
+@pytest.fixture
+def maze():
+    return np.loadtxt(open("test_maps/05_test_map.txt", "rb"), delimiter=",")
+
+
+@pytest.fixture
+def shape():
+    return BlockShape([[0, 1], [0, 2]])
+
+
+def test_rotations(shape):
+    """
+    Function that test the rotations of BlockShape
+    Args:
+        shape: a BlockShape with two blocks in a row on the east of the agent
+    """
+    np.testing.assert_array_equal(shape.arrays[1], np.array([[1, 0], [2, 0]]))
+    np.testing.assert_array_equal(shape.arrays[2], np.array([[0, -1], [0, -2]]))
+    np.testing.assert_array_equal(shape.arrays[3], np.array([[-1, 0], [-2, 0]]))
+    assert shape.rotate_index(0, 'ccw') == 3
+    assert shape.rotation_index([[2, 0], [1, 0]]) is None   # the order of the blocks matters
+    assert BlockShape([]).canonical == [0, 0, 0, 0]
+
+
+def test_placement_masks(maze, shape):
+    """
+    Function that test BlockShape.placement_masks against a cell by cell check
+    Args:
+        maze: a map for testing
+        shape: a BlockShape for testing
+    """
+    masks = shape.placement_masks(GridPathPlanner.walkable_mask(maze))
+    for rotation in range(4):
+        for y, x in np.ndindex(maze.shape):
+            free = True
+            for cell in shape.configuration(np.array([y, x]), rotation):
+                if not (0 <= cell[0] < maze.shape[0] and 0 <= cell[1] < maze.shape[1]) \
+                        or not GridPathPlanner.is_walkable(maze[cell[0], cell[1]]):
+                    free = False
+            assert masks[rotation, y, x] == free
@@ -0,0 +1,139 @@
+import pytest
+import random
+import numpy as np
+from collections import deque
+from classes.mapping.distance_field import wavefront, shortest_path, IncrementalDistanceField
+from classes.mapping.grid_path_planner import GridPathPlanner
+from classes.mapping.grid_map import GridMap
+import global_variables
+from mapGeneration import generateMap
+
+
+def bfs(walkable, source):
+    """queue based breadth first search used as reference"""
+    distances = np.full(walkable.shape, -1, dtype=int)
+    distances[source[0], source[1]] = 0
+    queue = deque([source])
+    while len(queue) > 0:
+        y, x = queue.popleft()
+        for direction in [[-1, 0], [1, 0], [0, 1], [0, -1]]:
+            new_y, new_x = y + direction[0], x + direction[1]
+            if 0 <= new_y < walkable.shape[0] and 0 <= new_x < walkable.shape[1] \
+                    and distances[new_y, new_x] == -1 and walkable[new_y, new_x]:
+                distances[new_y, new_x] = distances[y, x] + 1
+                queue.append((new_y, new_x))
+    return distances
+
+
+@pytest.fixture
+def walkable_maps():
+    random.seed(5)
+    maps = [GridPathPlanner.walkable_mask(np.loadtxt(open("test_maps/{}.txt".format(name), "rb"), delimiter=","))
+            for name in ['01_test_map', '05_test_map', 'agentA1']]
+    for size in [5, 20, 35]:
+        maps.append(GridPathPlanner.walkable_mask(generateMap(size, size + 3, 0.3, 2, 2)))
+    return maps
+
+
+def test_wavefront(walkable_maps):
+    """
+    Function that test distance_field.wavefront against a queue based breadth first search
+    Args:
+        walkable_maps: walkable masks of maps for testing
+    """
+    for walkable in walkable_maps:
+        for i in range(5):
+            source = (random.randrange(walkable.shape[0]), random.randrange(walkable.shape[1]))
+            np.testing.assert_array_equal(wavefront(walkable, np.array(source)), bfs(walkable, source))
+
+
+def test_wavefront_multiple_sources(walkable_maps):
+    """
+    Function that test distance_field.wavefront with more than one source
+    Args:
+        walkable_maps: walkable masks of maps for testing
+    """
+    walkable = walkable_maps[-1]
+    sources = [(1, 1), (walkable.shape[0] - 2, walkable.shape[1] - 2), (3, 7)]
+    expected = [bfs(walkable, source) for source in sources]
+    expected = np.where(np.stack(expected) == -1, np.iinfo(int).max, np.stack(expected)).min(axis=0)
+    expected[expected == np.iinfo(int).max] = -1
+    np.testing.assert_array_equal(wavefront(walkable, np.array(sources)), expected)
+
+
+def test_shortest_path(walkable_maps):
+    """
+    Function that test the paths rebuilt from the distance field
+    Args:
+        walkable_maps: walkable masks of maps for testing
+    """
+    for walkable in walkable_maps:
+        source = np.argwhere(walkable)[0]
+        distances = wavefront(walkable, source)
+        for target in np.ndindex(walkable.shape):
+            path = shortest_path(distances, target)
+            if distances[target] == -1:
+                assert path is None
+                continue
+            assert len(path) == distances[target] + 1
+            np.testing.assert_array_equal(path[0], source)
+            np.testing.assert_array_equal(path[-1], target)
+            assert (np.abs(np.diff(path, axis=0)).sum(axis=1) == 1).all()
+            assert walkable[path[1:, 0], path[1:, 1]].all()
+    assert shortest_path(distances, (-1, 0)) is None
+
+
+def test_incremental_distance_field(walkable_maps):
+    """
+    Function that test IncrementalDistanceField against the full recompute while the source moves, cells change
+    and the map is expanded
+    Args:
+        walkable_maps: walkable masks of maps for testing
+    """
+    for walkable in walkable_maps:
+        field = IncrementalDistanceField(check=True)
+        origin = np.array([0, 0])
+        source = np.argwhere(walkable)[0]
+        for step in range(60):
+            # move the source to a walkable neighbor
+            neighbors = [source + direction for direction in [[-1, 0], [1, 0], [0, 1], [0, -1]]]
+            neighbors = [cell for cell in neighbors if 0 <= cell[0] < walkable.shape[0]
+                         and 0 <= cell[1] < walkable.shape[1] and walkable[cell[0], cell[1]]]
+            if len(neighbors) > 0:
+                source = random.choice(neighbors)
+            # block or open some cells
+            for i in range(random.randrange(4)):
+                y, x = random.randrange(walkable.shape[0]), random.randrange(walkable.shape[1])
+                walkable[y, x] = not walkable[y, x]
+            # expand the map on the north or on the west
+            if step % 10 == 0:
+                walkable = np.vstack((np.ones((2, walkable.shape[1]), dtype=bool), walkable))
+                walkable = np.hstack((np.zeros((walkable.shape[0], 1), dtype=bool), walkable))
+                origin = origin + [2, 1]
+                source = source + [2, 1]
+            field.update(walkable, source, origin)
+
+
+def test_static_distance_fields():
+    """
+    Function that test the cache of the distance fields of GridMap on the fixed map
+    """
+    my_map = GridMap('Agent1', 5)
+    my_map._representation = np.loadtxt(open("test_maps/01_test_map.txt", "rb"), delimiter=",")
+    my_map._set_goal_top_left()
+    goal_top_left = my_map._from_relative_to_matrix(my_map.goal_top_left)
+
+    field = my_map.get_goal_area_distance_field()
+    np.testing.assert_array_equal(field, wavefront(my_map._walkable, goal_top_left))
+    assert my_map.get_goal_area_distance_field() is field
+
+    # writing a cell without changing the walkable cells keeps the field
+    empty_cells = np.argwhere(my_map._representation == global_variables.EMPTY_CELL)
+    my_map._write_representation(empty_cells[0][0], empty_cells[0][1], global_variables.EMPTY_CELL)
+    assert my_map.get_goal_area_distance_field() is field
+
+    # a new wall invalidates it
+    my_map._write_representation(empty_cells[-1][0], empty_cells[-1][1], global_variables.WALL_CELL)
+    field = my_map.get_goal_area_distance_field()
+    np.testing.assert_array_equal(field, wavefront(my_map._walkable, goal_top_left))
+    assert my_map.get_distance_to_goal_area(my_map.goal_top_left) == 0
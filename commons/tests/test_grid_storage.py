@@ -0,0 +1,31 @@
+import pytest
+import random
+import numpy as np
+from classes.mapping.grid_storage import GrowableGrid
+
+
+@pytest.fixture
+def matrix():
+    return np.loadtxt(open("test_maps/01_test_map.txt", "rb"), delimiter=",").astype(int)
+
+
+def test_grow(matrix):
+    """
+    Function that test GrowableGrid.grow against np.pad
+    Args:
+        matrix: a map for testing
+    """
+    random.seed(3)
+    grid = GrowableGrid(matrix, -1)
+    expected = np.copy(matrix)
+    for i in range(100):
+        padding = [random.choice([0, 0, 0, 1, 2, 7]) for side in range(4)]
+        grown = grid.grow(*padding)
+        expected = np.pad(expected, ((padding[0], padding[1]), (padding[2], padding[3])), 'constant',
+                          constant_values=-1)
+        np.testing.assert_array_equal(grown, expected)
+        # write some cells through the view
+        grown[random.randrange(grown.shape[0]), random.randrange(grown.shape[1])] = i
+        expected[...] = grown
+    assert grid.shape == expected.shape
+    assert grid.matrix.dtype == matrix.dtype
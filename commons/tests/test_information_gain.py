@@ -0,0 +1,27 @@
+import pytest
+import numpy as np
+from classes.mapping.information_gain import diamond_count
+
+
+@pytest.fixture
+def maze():
+    return np.loadtxt(open("test_maps/05_test_map.txt", "rb"), delimiter=",")
+
+
+def test_diamond_count(maze):
+    """
+    Function that test diamond_count against a cell by cell count of the unknown cells in vision range
+    Args:
+        maze: a map for testing
+    """
+    vision = 3
+    unknown = np.pad(maze == -1, vision, 'constant', constant_values=True)
+    counts = diamond_count(unknown, vision)
+    assert counts.shape == maze.shape
+    for y, x in np.ndindex(maze.shape):
+        expected = 0
+        for offset_y in range(-vision, vision + 1):
+            for offset_x in range(-vision, vision + 1):
+                if 0 < abs(offset_y) + abs(offset_x) <= vision:
+                    expected += unknown[vision + y + offset_y, vision + x + offset_x]
+        assert counts[y, x] == expected
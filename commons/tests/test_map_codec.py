@@ -0,0 +1,55 @@
+import pytest
+import numpy as np
+from classes.mapping import map_codec
+
+
+@pytest.fixture
+def explored_map():
+    return np.loadtxt(open("test_maps/agentA3_5agents.txt", "rb"), delimiter=",").astype(np.int16)
+
+
+def test_round_trip(explored_map):
+    """
+    Function that test that map_codec.decode gives back the map and the landmark encoded with map_codec.encode
+    Args:
+        explored_map: a map explored by an agent
+    """
+    data = map_codec.encode(explored_map, np.array([3, 7]))
+    decoded, land_mark = map_codec.decode(data)
+    np.testing.assert_array_equal(decoded, explored_map)
+    np.testing.assert_array_equal(land_mark, [3, 7])
+    assert len(data) < explored_map.size  # less than one byte per cell
+
+    # cells with positions that don't fit in 8 bits
+    cells = np.array([[-300, 2, -1], [5, 40000, 105]])
+    decoded, _ = map_codec.decode(map_codec.encode(cells))
+    np.testing.assert_array_equal(decoded, cells)
+    empty, _ = map_codec.decode(map_codec.encode(np.zeros((0, 3), dtype=int)))
+    assert empty.shape == (0, 3)
+
+
+def test_version(explored_map):
+    """
+    Function that test that a message of another version of the format is rejected
+    Args:
+        explored_map: a map explored by an agent
+    """
+    data = map_codec.encode(explored_map)
+    with pytest.raises(ValueError):
+        map_codec.decode(chr(map_codec.VERSION + 1) + data[1:])
+
+
+def test_invalid_header(explored_map):
+    """
+    Function that test that a message with an unknown dtype code or a negative shape is rejected
+    Args:
+        explored_map: a map explored by an agent
+    """
+    data = map_codec.encode(explored_map)
+    version, dtype_code, rows, columns, land_mark_y, land_mark_x = map_codec.HEADER.unpack_from(data)
+    payload = data[map_codec.HEADER.size:]
+    for header in [(version, 7, rows, columns, land_mark_y, land_mark_x),
+                   (version, dtype_code, -1, columns, land_mark_y, land_mark_x),
+                   (version, dtype_code, rows, -columns, land_mark_y, land_mark_x)]:
+        with pytest.raises(ValueError):
+            map_codec.decode(map_codec.HEADER.pack(*header) + payload)
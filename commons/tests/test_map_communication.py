@@ -0,0 +1,282 @@
+import time
+import pytest
+import numpy as np
+import global_variables
+from classes.mapping.grid_map import GridMap
+from classes.mapping.map_communication import MapCommunication
+from classes.mapping import map_codec
+
+
+class Message(object):
+    """a map_communication message"""
+    def __init__(self, agent_id, map, seq, keyframe):
+        self.agent_id = agent_id
+        self.map = map
+        self.seq = seq
+        self.keyframe = keyframe
+        self.request_keyframe_from = ''
+
+
+class Communication(object):
+    """keeps the sent messages instead of publishing them"""
+    def __init__(self):
+        self.messages = []
+
+    @property
+    def requests(self):
+        """agents whose keyframe has been requested"""
+        return [msg.request_keyframe_from for msg in self.messages if msg.request_keyframe_from]
+
+    def start_map(self, callback):
+        return None
+
+    def send_map(self, publisher, map, lm_y, lm_x, rows, columns, seq=0, keyframe=True, request_keyframe_from=''):
+        msg = Message('Agent1', map, seq, keyframe)
+        msg.request_keyframe_from = request_keyframe_from
+        self.messages.append(msg)
+
+
+class Agent(object):
+    def __init__(self):
+        self._agent_name = 'Agent1'
+        self._communication = Communication()
+        self.local_map = GridMap('Agent1', 5)
+        self.local_map.goal_area_fully_discovered = True
+        self.local_map.goal_top_left = np.array([0, 0])
+
+
+@pytest.fixture
+def map_communication():
+    return MapCommunication(Agent())
+
+
+def delta(seq, cells):
+    return Message('Agent2', map_codec.encode(np.array(cells)), seq, False)
+
+
+def bad_delta(seq):
+    data = delta(seq, [[0, 1, global_variables.WALL_CELL]]).map
+    return Message('Agent2', data[:map_codec.HEADER.size] + b'corrupted', seq, False)
+
+
+def test_bad_delta_is_dropped(map_communication):
+    """
+    test that a delta that can't be decoded is dropped and a keyframe is requested, without stopping the merge
+    Args:
+        map_communication: a MapCommunication instance for testing
+    """
+    local_map = map_communication.agent.local_map
+    map_communication._received_seq['Agent2'] = -1  # the messages of Agent2 are in order
+    map_communication._callback_map(bad_delta(0))
+    map_communication.map_merge()
+    assert map_communication.agent._communication.requests == ['Agent2']
+
+    map_communication._callback_map(delta(1, [[0, 1, global_variables.WALL_CELL]]))
+    map_communication.map_merge()
+    assert local_map._get_value_of_cell(local_map._from_relative_to_matrix([0, 1])) == global_variables.WALL_CELL
+
+
+def test_keyframe_of_another_version_is_dropped(map_communication):
+    """
+    test that a keyframe sent in another version of the format doesn't stop the merge
+    Args:
+        map_communication: a MapCommunication instance for testing
+    """
+    keyframe = map_codec.encode(np.zeros((3, 3)))
+    keyframe = map_codec.HEADER.pack(map_codec.VERSION + 1, *map_codec.HEADER.unpack_from(keyframe)[1:]) \
+        + keyframe[map_codec.HEADER.size:]
+    map_communication._callback_map(Message('Agent2', keyframe, 0, True))
+    map_communication.map_merge()
+    assert map_communication.agent._communication.requests == ['Agent2']
+
+
+def test_bad_delta_is_dropped_by_the_merge_worker(map_communication, monkeypatch):
+    """
+    test that the merge worker drops a delta that can't be decoded and keeps merging the next ones
+    Args:
+        map_communication: a MapCommunication instance for testing
+    """
+    monkeypatch.setattr(global_variables, 'MERGE_MAPS_IN_BACKGROUND', True)
+    local_map = map_communication.agent.local_map
+    map_communication._received_seq['Agent2'] = -1  # the messages of Agent2 are in order
+    map_communication._callback_map(bad_delta(0))
+    map_communication._stage_messages()  # what the worker thread does when messages arrive
+    map_communication.map_merge()
+    assert map_communication.agent._communication.requests == ['Agent2']
+
+    map_communication._callback_map(delta(1, [[0, 1, global_variables.WALL_CELL]]))
+    map_communication._stage_messages()
+    map_communication.map_merge()
+    assert local_map._get_value_of_cell(local_map._from_relative_to_matrix([0, 1])) == global_variables.WALL_CELL
+
+
+def test_pop_changed_cells(map_communication):
+    """
+    test that only the cells written by the agent are changed cells, not the ones merged from the other agents
+    Args:
+        map_communication: a MapCommunication instance for testing
+    """
+    local_map = map_communication.agent.local_map
+    local_map.pop_changed_cells()
+    cell = local_map._from_relative_to_matrix([0, 1])
+    local_map._write_representation(cell[0], cell[1], global_variables.WALL_CELL)
+    local_map.merge_cells(np.array([[1, 0]]), np.array([global_variables.WALL_CELL]))
+    positions, values = local_map.pop_changed_cells()
+    np.testing.assert_array_equal(positions, [[0, 1]])
+    np.testing.assert_array_equal(values, [global_variables.WALL_CELL])
+    assert len(local_map.pop_changed_cells()[0]) == 0
+
+
+def test_publish_map_sends_deltas(map_communication):
+    """
+    test that the map is sent as a keyframe the first time, and then only its changed cells are sent
+    Args:
+        map_communication: a MapCommunication instance for testing
+    """
+    local_map = map_communication.agent.local_map
+    local_map.goal_top_left = np.array([-1, -2])
+    messages = map_communication.agent._communication.messages
+    map_communication.publish_map()
+    assert [(msg.seq, msg.keyframe) for msg in messages] == [(0, True)]
+
+    cell = local_map._from_relative_to_matrix([0, 1])
+    local_map._write_representation(cell[0], cell[1], global_variables.WALL_CELL)
+    map_communication.publish_map()
+    map_communication.publish_map()  # nothing changed, nothing is sent
+    assert [(msg.seq, msg.keyframe) for msg in messages] == [(0, True), (1, False)]
+    cells, _ = map_codec.decode(messages[1].map)
+    np.testing.assert_array_equal(cells, [[1, 3, global_variables.WALL_CELL]])  # relative to the goal top left
+
+
+def test_missing_delta_requests_keyframe(map_communication):
+    """
+    test that a keyframe is requested when a delta is missing, and that the received deltas are merged anyway
+    Args:
+        map_communication: a MapCommunication instance for testing
+    """
+    local_map = map_communication.agent.local_map
+    map_communication._received_seq['Agent2'] = -1  # the messages of Agent2 are in order
+    map_communication._callback_map(delta(0, [[0, 1, global_variables.WALL_CELL]]))
+    map_communication._callback_map(delta(2, [[1, 0, global_variables.WALL_CELL]]))
+    map_communication.map_merge()
+    assert map_communication.agent._communication.requests == ['Agent2']
+    for position in [[0, 1], [1, 0]]:
+        assert local_map._get_value_of_cell(local_map._from_relative_to_matrix(position)) == global_variables.WALL_CELL
+
+
+def keyframe(seq, wall):
+    """keyframe of Agent2 with a wall in a position relative to the top left of the goal area"""
+    map = np.full((5, 5), global_variables.UNKNOWN_CELL)
+    map[2 + wall[0], 2 + wall[1]] = global_variables.WALL_CELL
+    return Message('Agent2', map_codec.encode(map, (2, 2)), seq, True)
+
+
+def is_wall(local_map, position):
+    return local_map._get_value_of_cell(local_map._from_relative_to_matrix(position)) == global_variables.WALL_CELL
+
+
+def test_newer_keyframe_supersedes_older_messages(map_communication):
+    """
+    test that a newer keyframe drops the older keyframe and the deltas received before it
+    Args:
+        map_communication: a MapCommunication instance for testing
+    """
+    local_map = map_communication.agent.local_map
+    map_communication._callback_map(keyframe(0, [0, 1]))
+    map_communication._callback_map(delta(1, [[1, 0, global_variables.WALL_CELL]]))
+    map_communication._callback_map(keyframe(2, [1, 1]))
+    map_communication._callback_map(delta(3, [[-1, 0, global_variables.WALL_CELL]]))
+    map_communication.map_merge()
+    assert map_communication.agent._communication.requests == []
+    assert is_wall(local_map, [1, 1]) and is_wall(local_map, [-1, 0])
+    assert not is_wall(local_map, [0, 1]) and not is_wall(local_map, [1, 0])
+    assert map_communication._received_seq['Agent2'] == 3
+
+
+def test_out_of_order_deltas(map_communication):
+    """
+    test that the deltas are merged in order of sequence number, and that the duplicated and late ones are dropped
+    without requesting a keyframe
+    Args:
+        map_communication: a MapCommunication instance for testing
+    """
+    local_map = map_communication.agent.local_map
+    map_communication._received_seq['Agent2'] = -1  # the messages of Agent2 are in order
+    map_communication._callback_map(delta(1, [[0, 1, global_variables.WALL_CELL]]))
+    map_communication._callback_map(delta(0, [[0, 1, global_variables.EMPTY_CELL]]))
+    map_communication.map_merge()
+    assert is_wall(local_map, [0, 1])  # only the unknown cells are filled, so the first delta wins
+
+    map_communication._callback_map(delta(0, [[1, 0, global_variables.WALL_CELL]]))
+    map_communication._callback_map(delta(1, [[1, 0, global_variables.WALL_CELL]]))
+    map_communication._callback_map(delta(2, [[-1, 0, global_variables.WALL_CELL]]))
+    map_communication.map_merge()
+    assert map_communication.agent._communication.requests == []
+    assert not is_wall(local_map, [1, 0]) and is_wall(local_map, [-1, 0])
+    assert map_communication._received_seq['Agent2'] == 2
+
+
+def test_keyframe_request(map_communication):
+    """
+    test that the map is sent as a keyframe when this agent is asked for it, and only in that case
+    Args:
+        map_communication: a MapCommunication instance for testing
+    """
+    messages = map_communication.agent._communication.messages
+    map_communication.publish_map()  # first keyframe
+    for agent_id in ['Agent3', 'Agent1']:
+        request = Message('Agent2', '', 0, False)
+        request.request_keyframe_from = agent_id
+        map_communication._callback_map(request)
+        map_communication.publish_map()
+    assert [(msg.seq, msg.keyframe) for msg in messages] == [(0, True), (1, True)]
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_bad_delta_drops_its_group(map_communication, monkeypatch, background):
+    """
+    test that the deltas received with a delta that can't be decoded are dropped too, and that the keyframe is
+    requested once, with and without the merge worker
+    Args:
+        map_communication: a MapCommunication instance for testing
+        background: if the maps are merged with the merge worker
+    """
+    monkeypatch.setattr(global_variables, 'MERGE_MAPS_IN_BACKGROUND', background)
+    local_map = map_communication.agent.local_map
+    map_communication._received_seq['Agent2'] = -1  # the messages of Agent2 are in order
+    map_communication._callback_map(delta(0, [[0, 1, global_variables.WALL_CELL]]))
+    map_communication._callback_map(bad_delta(1))
+    map_communication._callback_map(bad_delta(2))
+    if background:
+        map_communication._stage_messages()
+    map_communication.map_merge()
+    assert map_communication.agent._communication.requests == ['Agent2']
+    assert not is_wall(local_map, [0, 1])
+
+
+def wait_for(condition):
+    """wait at most 5 seconds for the merge worker"""
+    for _ in range(500):
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_merge_worker_thread(monkeypatch):
+    """
+    test that the merge worker thread stages the messages received between two steps, and that it keeps running after
+    a message that can't be decoded
+    """
+    monkeypatch.setattr(global_variables, 'MERGE_MAPS_IN_BACKGROUND', True)
+    map_communication = MapCommunication(Agent())
+    local_map = map_communication.agent.local_map
+    map_communication._received_seq['Agent2'] = -1  # the messages of Agent2 are in order
+
+    map_communication._callback_map(bad_delta(0))
+    assert wait_for(lambda: map_communication.agent._communication.requests == ['Agent2'])
+
+    map_communication._callback_map(delta(1, [[0, 1, global_variables.WALL_CELL]]))
+    assert wait_for(lambda: len(map_communication._staged_cells) > 0)
+    map_communication.map_merge()
+    assert is_wall(local_map, [0, 1])
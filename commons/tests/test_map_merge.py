@@ -1,7 +1,7 @@
 import pytest
 import numpy as np
 from classes.mapping.grid_map import GridMap
-from classes.mapping.map_merge import mapMerge
+from classes.mapping.map_merge import mapMerge, fillUnknown
 
 def load_map(map_name, origin):
     my_map = GridMap('Agent1', 5)
@@ -35,3 +35,21 @@ def test_left_corner(map1, map2, map3):
 
 
 
+
+def test_fill_unknown(map1, map2):
+    """
+    Function that test the function fillUnknown against a cell by cell fill
+    Args:
+        map1: the map that is copied
+        map2: the map that is filled
+    """
+    external_map = map1._representation[2:, 3:]
+    my_map = np.copy(map2._representation)
+    expected = np.copy(my_map)
+    for i, j in np.ndindex(external_map.shape):
+        if expected[i + 1, j] == -1:
+            expected[i + 1, j] = external_map[i, j]
+    changed = fillUnknown(external_map, my_map, np.array([1, 0]))
+    np.testing.assert_array_equal(my_map, expected)
+    assert changed == np.count_nonzero(my_map != map2._representation)
+    assert fillUnknown(external_map, my_map, np.array([1, 0])) == 0
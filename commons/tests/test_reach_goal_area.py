@@ -1,5 +1,6 @@
 import pytest
 import numpy as np
+import global_variables
 from classes.mapping.grid_map import GridMap
 from classes.mapping.block import Block
 
@@ -56,3 +57,30 @@ def test_possible_configurations_obstacle1(map5):
     desired_configurations.append(np.array([[-2, -1], [-3, -1], [-4, -1]]))
 
     np.testing.assert_array_equal(possible_configurations, desired_configurations)
+
+
+def test_world_frame(map1):
+    """
+    test the conversions between the world frame (relative to the top left of the goal area) and the others
+    Args:
+        map1: a GridMap instance for testing
+    """
+    assert map1.world_frame_known
+    world = np.array([[0, 0], [1, 1], [-3, 2]])
+    np.testing.assert_array_equal(map1._from_world_to_relative(world), world + map1.goal_top_left)
+    np.testing.assert_array_equal(map1._from_world_to_matrix(world),
+                                  map1._from_relative_to_matrix(world + map1.goal_top_left))
+    np.testing.assert_array_equal(map1._from_relative_to_world(map1._from_world_to_relative(world)), world)
+    np.testing.assert_array_equal(map1._from_matrix_to_world(map1._from_world_to_matrix(world)), world)
+    np.testing.assert_array_equal(map1._from_world_to_matrix([0, 0]), map1._from_relative_to_matrix(map1.goal_top_left))
+
+    # the world position of a dispenser is its relative position minus the top left of the goal area ([-3, -2])
+    cell = map1._from_relative_to_matrix([1, 2])
+    map1._write_representation(cell[0], cell[1], global_variables.DISPENSER_STARTING_NUMBER)
+    dispenser_type = GridMap.get_dispenser_type(global_variables.DISPENSER_STARTING_NUMBER)
+    np.testing.assert_array_equal(map1._from_relative_to_world(map1.get_dispenser_positions(dispenser_type)), [[4, 4]])
+
+    map1.goal_top_left = None
+    assert not map1.world_frame_known
+    with pytest.raises(ValueError):
+        map1._from_relative_to_world([1, 2])